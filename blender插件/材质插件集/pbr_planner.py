@@ -0,0 +1,562 @@
+"""PBR 贴图库的纯数据层 (不依赖 bpy): 扫描与 .pbrignore 规则, 文件头读取, 贴图分类/UDIM, 材质规划 (MaterialSpec)
+
+sbsar工具v3 导入本模块, 只在主线程按规划创建节点; 本模块可在 Blender 外单独测试与基准 (python pbr_planner.py),
+规划进程池的子进程也只导入本模块
+"""
+
+import math
+import multiprocessing
+import os
+import queue
+import re
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+
+# =============================================================================
+# 目录扫描与 .pbrignore
+# =============================================================================
+
+# 并行扫描参数: 同时扫描的目录数 / 单个目录超时 (秒)
+SCAN_MAX_WORKERS = 8
+SCAN_DIR_TIMEOUT = 15.0
+
+# .pbrignore: gitignore 风格的忽略规则, 可放在库根目录或任意子目录
+IGNORE_FILE = ".pbrignore"
+DEFAULT_IGNORE_RULES = (".git/", ".svn/", "Backup_*/")  # rename.py 生成的备份目录
+
+def _ignore_pattern_regex(pattern, anchored):
+    """将 gitignore 通配符转换为匹配相对路径 (以 / 分隔) 的正则"""
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i): out.append("(?:.*/)?"); i += 3; continue
+        if pattern.startswith("**", i): out.append(".*"); i += 2; continue
+        if c == "*": out.append("[^/]*")
+        elif c == "?": out.append("[^/]")
+        elif c == "[" and "]" in pattern[i + 1:]:
+            end = pattern.index("]", i + 1)
+            body = pattern[i + 1:end]
+            out.append("[" + ("^" + body[1:] if body.startswith("!") else body) + "]")
+            i = end
+        else: out.append(re.escape(c))
+        i += 1
+    return re.compile(("^" if anchored else "^(?:.*/)?") + "".join(out) + "$")
+
+def compile_ignore_rules(lines, base):
+    """编译忽略规则: 返回 ((base, regex, 取反, 仅目录), ...), 后出现的规则优先"""
+    rules = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"): continue
+        negate = line.startswith("!")
+        if negate: line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line: continue
+        # 含 / 的规则相对规则文件所在目录锚定, 否则匹配任意层级的名称
+        anchored = "/" in line
+        rules.append((base, _ignore_pattern_regex(line.lstrip("/"), anchored), negate, dir_only))
+    return tuple(rules)
+
+@lru_cache(maxsize=1024)
+def _load_ignore_file_cached(path, mtime):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f: lines = f.read().splitlines()
+    except OSError: return ()
+    return compile_ignore_rules(lines, os.path.dirname(path))
+
+def load_ignore_file(path):
+    """读取并编译 .pbrignore (按修改时间缓存)"""
+    try: return _load_ignore_file_cached(path, os.stat(path).st_mtime_ns)
+    except OSError: return ()
+
+def is_ignored(rules, path, is_dir):
+    """按规则判断路径是否被忽略 (最后匹配的规则生效)"""
+    ignored = False
+    for base, regex, negate, dir_only in rules:
+        if dir_only and not is_dir: continue
+        if not path.startswith(base): continue
+        rel = path[len(base):].lstrip("\\/").replace("\\", "/")
+        if rel and regex.match(rel): ignored = not negate
+    return ignored
+
+def root_ignore_rules(root_path):
+    """库根目录的初始规则 (内置默认规则), 子目录中的 .pbrignore 在扫描时叠加"""
+    return compile_ignore_rules(DEFAULT_IGNORE_RULES, root_path)
+
+def scan_directory(path, extensions, rules=()):
+    """扫描单个目录, 返回 (符合后缀的文件, 子目录, 子目录继承的规则, 被忽略的条目数)
+    
+    被忽略的子目录在这里直接剪掉, 不会再对其调用 scandir
+    """
+    files, dirs, skipped = [], [], 0
+    with os.scandir(path) as it: entries = list(it)
+    if any(e.name == IGNORE_FILE for e in entries): rules = rules + load_ignore_file(os.path.join(path, IGNORE_FILE))
+    for entry in entries:
+        is_dir = entry.is_dir(follow_symlinks=False)
+        if rules and is_ignored(rules, entry.path, is_dir):
+            skipped += 1
+            continue
+        if is_dir: dirs.append(entry.path)
+        elif entry.name.lower().endswith(extensions): files.append(entry.path)
+    files.sort()
+    return files, dirs, rules, skipped
+
+def iter_files_with_depth(root_path, depth, extensions, max_workers=SCAN_MAX_WORKERS, dir_timeout=SCAN_DIR_TIMEOUT, stats=None):
+    """并行流式扫描: 每个目录一个任务, 边扫描边产出 (folder_name, files)
+    
+    产出顺序为各目录扫描完成的顺序, 每次运行可能不同 (组内文件已排序); 需要稳定顺序时用 scan_files_with_depth。
+    扫描线程总数 (含超时放弃但仍未返回的线程) 不超过 max_workers, 全部被卡住时放弃剩余目录。
+    stats 字典会记录 timeouts (超时放弃的目录数), errors (无法读取的目录数) 与 ignored (.pbrignore 忽略的条目数)
+    """
+    root_path = os.path.abspath(root_path)
+    stats = {} if stats is None else stats
+    stats.setdefault("timeouts", 0)
+    stats.setdefault("errors", 0)
+    stats.setdefault("ignored", 0)
+    results = queue.Queue()
+    pending = deque([(root_path, 0, root_ignore_rules(root_path))])
+    running = {}  # path -> (开始时间, 深度)
+    stuck = set()  # 已超时放弃但线程尚未返回的目录 (线程无法强制结束, 继续占用名额)
+
+    def worker(path, rules):
+        try: results.put((path, scan_directory(path, extensions, rules)))
+        except OSError: results.put((path, None))
+
+    while pending or running:
+        # 保持最多 max_workers 个扫描线程 (守护线程: 卡死的共享盘不会阻塞退出)
+        while pending and len(running) + len(stuck) < max_workers:
+            path, level, rules = pending.popleft()
+            running[path] = (time.monotonic(), level)
+            threading.Thread(target=worker, args=(path, rules), daemon=True).start()
+
+        if not running:
+            # 名额全被超时目录占用: 再等一个超时周期, 仍无线程返回则放弃剩余目录
+            try: path, _ = results.get(timeout=dir_timeout)
+            except queue.Empty:
+                stats["timeouts"] += len(pending)
+                print(f"扫描线程均卡在超时目录上, 已跳过剩余 {len(pending)} 个目录")
+                return
+            stuck.discard(path)
+            continue
+
+        wait = max(0.05, min(t + dir_timeout for t, _ in running.values()) - time.monotonic())
+        try: path, result = results.get(timeout=wait)
+        except queue.Empty:
+            # 放弃超时的目录
+            now = time.monotonic()
+            for p in [p for p, (t, _) in running.items() if now - t > dir_timeout]:
+                del running[p]
+                stuck.add(p)
+                stats["timeouts"] += 1
+                print(f"扫描超时, 已跳过: {p}")
+            continue
+
+        if path not in running:  # 已超时放弃的目录, 释放其名额
+            stuck.discard(path)
+            continue
+        _, level = running.pop(path)
+        if result is None:
+            stats["errors"] += 1
+            continue
+        files, dirs, rules, skipped = result
+        stats["ignored"] += skipped
+        # 达到指定深度停止递归
+        if level < depth: pending.extend((d, level + 1, rules) for d in dirs)
+        if files: yield os.path.basename(path) or os.path.basename(root_path), files
+
+def scan_files_with_depth(root_path, depth, extensions):
+    """递归扫描指定目录深度的文件, 按文件夹路径排序 (与并行扫描的完成顺序无关)"""
+    return sorted(iter_files_with_depth(root_path, depth, extensions), key=lambda g: g[1][0])
+
+def scan_summary(stats):
+    """扫描统计的附加报告文本"""
+    parts = []
+    if stats.get("timeouts"): parts.append(f"{stats['timeouts']} 个目录超时")
+    if stats.get("errors"): parts.append(f"{stats['errors']} 个目录无法读取")
+    if stats.get("ignored"): parts.append(f"{stats['ignored']} 个条目被忽略")
+    return f" (跳过: {', '.join(parts)})" if parts else ""
+
+def _read_png_size(f):
+    head = f.read(24)
+    if head[:8] != b"\x89PNG\r\n\x1a\n" or head[12:16] != b"IHDR": return None
+    return struct.unpack(">II", head[16:24])
+
+def _read_jpeg_size(f):
+    if f.read(2) != b"\xff\xd8": return None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF: return None
+        code = marker[1]
+        if code == 0xFF: f.seek(-1, os.SEEK_CUR); continue  # 填充字节
+        if code in (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7): continue  # 无长度标记
+        seg = f.read(2)
+        if len(seg) < 2: return None
+        length = struct.unpack(">H", seg)[0]
+        # SOF0-SOF15 (排除 DHT/JPG/DAC) 中记录了图像尺寸
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5: return None
+            h, w = struct.unpack(">HH", data[1:5])
+            return w, h
+        f.seek(length - 2, os.SEEK_CUR)
+
+def _read_tga_size(f):
+    head = f.read(18)
+    if len(head) < 18: return None
+    return struct.unpack("<HH", head[12:16])
+
+def _read_tiff_tags(f, wanted):
+    """读取 TIFF 首个 IFD 中指定标签的第一个数值, 非 TIFF 返回 None"""
+    head = f.read(8)
+    if head[:4] == b"II*\x00": endian = "<"
+    elif head[:4] == b"MM\x00*": endian = ">"
+    else: return None
+    f.seek(struct.unpack(endian + "I", head[4:8])[0])
+    count = struct.unpack(endian + "H", f.read(2))[0]
+    tags = {}
+    for _ in range(count):
+        tag, typ, n, value = struct.unpack(endian + "HHI4s", f.read(12))
+        if tag not in wanted: continue
+        if typ == 3 and n > 2:  # 超过 4 字节的 SHORT 数组存放在偏移处
+            pos = f.tell()
+            f.seek(struct.unpack(endian + "I", value)[0])
+            value = f.read(2)
+            f.seek(pos)
+        tags[tag] = struct.unpack(endian + "H", value[:2])[0] if typ == 3 else struct.unpack(endian + "I", value)[0]
+        if len(tags) == len(wanted): break
+    return tags
+
+def _read_tiff_size(f):
+    tags = _read_tiff_tags(f, (256, 257))
+    return (tags[256], tags[257]) if tags and len(tags) == 2 else None
+
+def _read_exr_size(f):
+    if f.read(8)[:4] != b"\x76\x2f\x31\x01": return None
+    # 头部为 name\0 type\0 size value 序列, 以空名称结束
+    for _ in range(256):
+        name = b"".join(iter(lambda: f.read(1), b"\x00"))
+        if not name: return None
+        typ = b"".join(iter(lambda: f.read(1), b"\x00"))
+        size = struct.unpack("<i", f.read(4))[0]
+        if name == b"dataWindow" and typ == b"box2i":
+            x0, y0, x1, y1 = struct.unpack("<iiii", f.read(16))
+            return x1 - x0 + 1, y1 - y0 + 1
+        f.seek(size, os.SEEK_CUR)
+    return None
+
+def _read_png_depth(f):
+    head = f.read(25)
+    if head[:8] != b"\x89PNG\r\n\x1a\n" or head[12:16] != b"IHDR": return None
+    return head[24]
+
+def _read_tiff_depth(f):
+    tags = _read_tiff_tags(f, (258,))
+    return tags.get(258, 1) if tags is not None else None
+
+def _read_exr_depth(f):
+    return 32 if f.read(4) == b"\x76\x2f\x31\x01" else None  # half 也会解码为浮点缓冲
+
+_IMAGE_HEADER_READERS = {
+    "size": {
+        ".png": _read_png_size, ".jpg": _read_jpeg_size, ".jpeg": _read_jpeg_size,
+        ".tga": _read_tga_size, ".tif": _read_tiff_size, ".tiff": _read_tiff_size, ".exr": _read_exr_size,
+    },
+    "depth": {
+        ".png": _read_png_depth, ".jpg": lambda f: 8, ".jpeg": lambda f: 8,
+        ".tga": lambda f: 8, ".tif": _read_tiff_depth, ".tiff": _read_tiff_depth, ".exr": _read_exr_depth,
+    },
+}
+
+@lru_cache(maxsize=65536)
+def _read_image_header_cached(path, mtime, kind):
+    reader = _IMAGE_HEADER_READERS[kind].get(os.path.splitext(path)[1].lower())
+    if not reader: return None
+    try:
+        with open(path, "rb") as f: return reader(f)
+    except (OSError, struct.error): return None
+
+def read_image_size(path):
+    """只读取文件头获取图片尺寸 (w, h), 不解码像素; 不支持或读取失败返回 None"""
+    try: mtime = os.stat(path).st_mtime_ns
+    except OSError: return None
+    return _read_image_header_cached(path, mtime, "size")
+
+def read_image_bit_depth(path):
+    """只读取文件头获取每通道位深 (8 / 16 / 32); 不支持或读取失败返回 None"""
+    try: mtime = os.stat(path).st_mtime_ns
+    except OSError: return None
+    return _read_image_header_cached(path, mtime, "depth")
+
+def is_high_bit_depth(path):
+    """是否会被 Blender 加载为浮点缓冲 (EXR / 16 位 PNG / 16 位 TIFF)"""
+    depth = read_image_bit_depth(path)
+    return bool(depth and depth > 8)
+
+# =============================================================================
+# 贴图分类
+# =============================================================================
+
+TEXTURE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.exr', '.tif', '.tga')
+
+# 贴图后缀名关键字映射
+texture_type_mapping = {
+    "_c": "BaseColor", "_n": "Normal", "_e": "Emission", "_ao": "AmbientOcclusion",
+    "_r": "Roughness", "_m": "Metallic", "_arm": "ARM", "_d": "Displacement",
+    "_h": "Displacement", "_o": "Alpha", "base": "BaseColor", "color": "BaseColor",
+    "diffuse": "BaseColor", "albedo": "BaseColor", "col": "BaseColor",
+    "emissive": "Emission", "emission": "Emission", "metallic": "Metallic",
+    "metalness": "Metallic", "roughness": "Roughness", "normal": "Normal",
+    "nrm": "Normal", "bump": "Bump", "height": "Displacement",
+    "displacement": "Displacement", "disp": "Displacement", "opacity": "Alpha",
+    "alpha": "Alpha", "ao": "AmbientOcclusion",
+}
+
+# 预编译分类器: 映射表顺序即优先级
+# 后缀匹配按末两位字符分桶 (所有关键字至少两位), 包含匹配合并为一条交替正则
+_TEXTURE_TYPES = tuple(set(texture_type_mapping.values()))
+_KEY_PRIORITY = {k: i for i, k in enumerate(texture_type_mapping)}
+_SUFFIX_BUCKETS = {}
+for _k, _v in texture_type_mapping.items(): _SUFFIX_BUCKETS.setdefault(_k[-2:], []).append((_k, _v))
+_SUFFIX_BUCKETS = {tail: tuple(keys) for tail, keys in _SUFFIX_BUCKETS.items()}
+_CONTAINS_RE = re.compile("(?=(%s))" % "|".join(re.escape(k) for k in texture_type_mapping))
+
+@lru_cache(maxsize=1 << 18)
+def classify_texture_stem(stem):
+    """按小写文件名主干识别贴图类型 (后缀优先, 其次包含), 无法识别返回 None"""
+    if "sheenopacity" in stem: return None
+    for k, v in _SUFFIX_BUCKETS.get(stem[-2:], ()):
+        if stem.endswith(k): return v
+    hits = [m.group(1) for m in _CONTAINS_RE.finditer(stem)]
+    return texture_type_mapping[min(hits, key=_KEY_PRIORITY.__getitem__)] if hits else None
+
+# UDIM 编号: facade_c.1001.png / facade_c_1002.png
+_UDIM_RE = re.compile(r"^(.+)[._](1\d{3})$")
+
+@lru_cache(maxsize=1 << 16)
+def split_udim(stem):
+    """拆分主干中的 UDIM 编号: 返回 (去掉编号的主干, 编号或 None)"""
+    m = _UDIM_RE.match(stem)
+    return (m.group(1), int(m.group(2))) if m else (stem, None)
+
+def udim_sequences(texture_files):
+    """识别 UDIM 序列 (至少两个分块): 返回 [[(编号, 路径), ...]], 按编号排序"""
+    sequences = {}
+    for f in texture_files:
+        stem, ext = os.path.splitext(os.path.basename(f))
+        base, tile = split_udim(stem)
+        if tile is not None: sequences.setdefault((os.path.dirname(f), base.lower(), ext.lower()), []).append((tile, f))
+    return [sorted(seq) for seq in sequences.values() if len(seq) > 1]
+
+def udim_tiles(texture_files):
+    """UDIM 序列: {首个分块路径: [分块编号]}"""
+    return {seq[0][1]: [t for t, _ in seq] for seq in udim_sequences(texture_files)}
+
+def classify_texture_file(path):
+    """识别单个贴图文件的类型 (忽略 UDIM 编号)"""
+    return classify_texture_stem(split_udim(os.path.splitext(os.path.basename(path))[0])[0].lower())
+
+def classify_texture_files(texture_files, target_size=0):
+    """整理文件列表: 每种类型保留一个文件 (默认第一个匹配, 指定目标分辨率时取最接近的档位)
+    
+    UDIM 序列只保留首个分块代表整个序列
+    """
+    other_tiles = {f for seq in udim_sequences(texture_files) for _, f in seq[1:]}
+    candidates = {}
+    for f in texture_files:
+        if f in other_tiles: continue
+        t_type = classify_texture_file(f)
+        if t_type: candidates.setdefault(t_type, []).append(f)
+    
+    ordered_files = dict.fromkeys(_TEXTURE_TYPES)
+    for t_type, files in candidates.items():
+        ordered_files[t_type] = pick_resolution_tier(files, target_size) if target_size and len(files) > 1 else files[0]
+    return ordered_files
+
+def pick_resolution_tier(files, target_size):
+    """按文件头尺寸选择最接近目标分辨率的文件 (按长边的倍数差比较, 相同时取较小者)"""
+    def distance(f):
+        size = read_image_size(f)
+        if not size or max(size) <= 0: return (float("inf"), 0)
+        return (abs(math.log2(max(size) / target_size)), max(size))
+    return min(files, key=distance)
+
+_STEM_SEPARATORS = "_-. "
+_RESOLUTION_TOKEN_RE = re.compile(r"(?:^|(?<=[_\-. ]))\d{1,2}k$")
+
+def texture_stem_prefix(stem):
+    """去掉小写主干中的类型关键字 (及其后部分) 得到贴图组前缀, 无法识别返回 None"""
+    if not classify_texture_stem(stem): return None
+    spans = {m.start(): m.start() + len(m.group(1)) for m in _CONTAINS_RE.finditer(stem)}
+    # 从最右侧关键字开始, 向左吞并紧邻的关键字 (如 base+color)
+    cut = max(spans)
+    ends = {end: start for start, end in spans.items()}
+    while cut in ends and ends[cut] < cut: cut = ends[cut]
+    # 同组多分辨率文件 (如 brick_2k_c / brick_4k_c) 归入同一前缀
+    return _RESOLUTION_TOKEN_RE.sub("", stem[:cut].rstrip(_STEM_SEPARATORS)).rstrip(_STEM_SEPARATORS)
+
+def group_flat_files(texture_files, fallback_name):
+    """平铺文件夹分组: 一次排序后按去掉类型后缀的主干前缀聚类, 返回 [(name, files)]"""
+    keyed = []
+    for f in texture_files:
+        stem = split_udim(os.path.splitext(os.path.basename(f))[0])[0]
+        prefix = texture_stem_prefix(stem.lower())
+        if prefix is None: continue
+        keyed.append((prefix, stem[:len(prefix)] or fallback_name, f))
+    keyed.sort()
+    
+    groups = []
+    for _, items in groupby(keyed, key=itemgetter(0)):
+        items = list(items)
+        groups.append((items[0][1], [f for _, _, f in items]))
+    return groups
+
+def benchmark_classifier(count=1000000, library_sets=40000):
+    """纯 Python 分类器基准 (不依赖 bpy): 打印冷/热缓存下的 files/sec"""
+    suffixes = ("_c", "_n", "_ao", "_r", "_m", "_arm", "_h", "_basecolor", "_roughness", "_normal_gl", "_preview")
+    names = [f"set{(i // len(suffixes)) % library_sets:05d}{suffixes[i % len(suffixes)]}.png" for i in range(count)]
+    classify_texture_stem.cache_clear()
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        for n in names: classify_texture_file(n)
+        elapsed = time.perf_counter() - start
+        print(f"[classifier] {label}: {count} files in {elapsed:.2f}s -> {count / elapsed:,.0f} files/sec")
+
+# =============================================================================
+# 材质规划 (MaterialSpec)
+# =============================================================================
+# spec  = {"channels": {贴图类型: 路径}, "tiles": {UDIM 首个分块: [编号]}}
+# graph = {"nodes": [节点描述], "links": [(源节点, 输出, 目标节点, 输入)], "values": [(节点, 输入, 值)]}
+
+COLOR_CHANNELS = ("BaseColor", "Emission")  # 按 sRGB 读取的通道, 其余为非颜色数据
+# 节点组名称 (组在 sbsar工具v3 中构建; 修改组内连线时提升版本号)
+PBR_GROUP_NAME = "PBR Master v1"
+PBR_PREVIEW_GROUP_NAME = "PBR Preview v1"
+# 贴图类型 -> 组输入 (AO 只加载不连接)
+PBR_GROUP_SOCKETS = {
+    "BaseColor": "Base Color", "ARM": "ARM", "Metallic": "Metallic", "Roughness": "Roughness", "Emission": "Emission",
+    "Normal": "Normal", "Bump": "Bump", "Displacement": "Displacement", "Alpha": "Alpha",
+}
+TEXTURE_NODE_ORDER = ("BaseColor", "ARM", "Metallic", "Roughness", "Emission", "Normal", "Bump", "Alpha", "Displacement", "AmbientOcclusion")
+
+def plan_texture_set(texture_files, target_size=0):
+    """规划贴图组: 每个通道选用的文件 (只读文件头) 与 UDIM 分块"""
+    return {"channels": classify_texture_files(texture_files, target_size), "tiles": udim_tiles(texture_files)}
+
+def plan_node_graph(channels, tiles=None):
+    """规划材质节点与连线: 节点以名称引用, 贴图节点以贴图类型命名"""
+    tiles = tiles or {}
+    nodes = [
+        {"name": "Master", "type": 'ShaderNodeGroup', "group": PBR_GROUP_NAME, "location": (200, -200)},
+        {"name": "Output", "type": 'ShaderNodeOutputMaterial', "location": (600, -200)},
+        {"name": "Preview", "type": 'ShaderNodeGroup', "group": PBR_PREVIEW_GROUP_NAME, "location": (200, 200)},
+        {"name": "PreviewOutput", "type": 'ShaderNodeOutputMaterial', "location": (600, 200)},
+        {"name": "TexCoord", "type": 'ShaderNodeTexCoord', "location": (-900, 0)},
+        {"name": "Mapping", "type": 'ShaderNodeMapping', "location": (-700, 0)},
+    ]
+    links = [("Master", "BSDF", "Output", "Surface"), ("Preview", "BSDF", "PreviewOutput", "Surface"), ("TexCoord", "UV", "Mapping", "Vector")]
+    values, textures = [], []
+    for t_type in TEXTURE_NODE_ORDER:
+        path = channels.get(t_type)
+        if not path: continue
+        # 不透明度已打包进 BaseColor: 直接使用其 Alpha 输出
+        if t_type == "Alpha" and path == channels.get("BaseColor"):
+            links.append(("BaseColor", "Alpha", "Master", "Alpha"))
+            continue
+        textures.append({"name": t_type, "type": 'ShaderNodeTexImage', "label": t_type, "image": path,
+                         "is_color": t_type in COLOR_CHANNELS, "tiles": tiles.get(path)})
+        links.append(("Mapping", "Vector", t_type, "Vector"))
+        # 存在 ARM 时单独的金属度/粗糙度贴图只加载不连接
+        target = PBR_GROUP_SOCKETS.get(t_type)
+        if target and not (t_type in ("Metallic", "Roughness") and channels.get("ARM")): links.append((t_type, "Color", "Master", target))
+        if t_type == "Displacement": links.append(("Master", "Displacement", "Output", "Displacement"))
+        if t_type in ("BaseColor", "Normal"): links.append((t_type, "Color", "Preview", "Base Color" if t_type == "BaseColor" else "Normal"))
+    values.append(("Master", "ARM Factor", 1.0 if channels.get("ARM") else 0.0))
+    for i, tex in enumerate(textures): tex["location"] = (-400, 300 * (len(textures) - i))  # 自上而下排列
+    return {"nodes": nodes + textures, "links": links, "values": values}
+
+# 进程池规划: 以 spawn 启动 (不 fork 多线程的宿主进程), 子进程只导入本模块
+PLAN_MAX_WORKERS = min(4, os.cpu_count() or 1)
+PLAN_BATCH = 64  # 每个进程池任务最多规划的贴图组数
+PLAN_WINDOW = PLAN_MAX_WORKERS * 2  # 同时在途的批次数
+
+def new_plan_pool(max_workers=PLAN_MAX_WORKERS):
+    """新建规划进程池; 当前解释器不能启动 Python 子进程 (旧版 Blender 的 sys.executable 是 blender 本身) 时返回 None"""
+    if not os.path.basename(sys.executable or "").lower().startswith("python"): return None
+    try: return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+    except (OSError, ValueError) as e:
+        print(f"无法创建规划进程池, 改为就地规划: {e}")
+        return None
+
+def plan_texture_sets(batch, target_size=0):
+    """批量规划 (进程池任务单元): [(name, files)] -> [spec]"""
+    return [plan_texture_set(files, target_size) for _, files in batch]
+
+def plan_groups(groups, target_size=0, pool=None, batch_size=PLAN_BATCH, window=PLAN_WINDOW):
+    """贴图组迭代器: 按输入顺序产出 (name, files, spec); 没有进程池时逐组就地规划
+    
+    有进程池时分批并行: 没有在途批次时立即提交 (第一组不等凑满批次), 否则攒满 batch_size 再提交;
+    已完成的批次随时产出, 在途批次达到 window 时等待最早的一批。进程池出错后剩余批次就地规划
+    """
+    if pool is None:
+        for name, files in groups: yield name, files, plan_texture_set(files, target_size)
+        return
+    pending, batch, broken = deque(), [], False
+
+    def submit(items):
+        nonlocal broken
+        future = None
+        if not broken:
+            try: future = pool.submit(plan_texture_sets, items, target_size)
+            except Exception as e:  # 进程池已关闭或已损坏
+                print(f"并行规划失败, 改为就地规划: {e}")
+                broken = True
+        pending.append((items, future))
+
+    def take():
+        nonlocal broken
+        items, future = pending.popleft()
+        specs = None
+        if future is not None:
+            try: specs = future.result()
+            except Exception as e:  # 子进程崩溃 / 无法启动
+                if not broken: print(f"并行规划失败, 改为就地规划: {e}")
+                broken = True
+        if specs is None: specs = plan_texture_sets(items, target_size)
+        return [(name, files, spec) for (name, files), spec in zip(items, specs)]
+
+    for group in groups:
+        batch.append(group)
+        if not pending or len(batch) >= batch_size:
+            submit(batch)
+            batch = []
+        while pending and (len(pending) >= window or pending[0][1] is None or pending[0][1].done()): yield from take()
+    if batch: submit(batch)
+    while pending: yield from take()
+
+def benchmark_planner(sets=20000):
+    """规划层基准 (不创建节点): 打印就地规划 (冷/热缓存) 与进程池规划的 sets/sec"""
+    suffixes = ("_c", "_n", "_r", "_m", "_ao", "_h")
+    groups = [(f"set{i:05d}", [f"/lib/set{i:05d}/set{i:05d}{s}.png" for s in suffixes]) for i in range(sets)]
+    pool = new_plan_pool()
+    classify_texture_stem.cache_clear()
+    try:
+        for label, p in (("inline cold", None), ("inline warm", None), ("pool", pool)):
+            if label == "pool" and p is None: continue
+            start = time.perf_counter()
+            for _, _, spec in plan_groups(iter(groups), pool=p): plan_node_graph(**spec)
+            elapsed = time.perf_counter() - start
+            print(f"[planner] {label}: {sets} sets in {elapsed:.2f}s -> {sets / elapsed:,.0f} sets/sec")
+    finally:
+        if pool: pool.shutdown()
+
+if __name__ == "__main__":
+    benchmark_classifier()
+    benchmark_planner()
@@ -9,178 +9,1039 @@ bl_info = {
 }
 
 import bpy
+import bmesh
+import argparse
+import fnmatch
 import os
+import hashlib
+import json
 import math
+import re
+import subprocess
+import sys
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+try: from PIL import Image as PILImage  # 可选: 并行解码需要 Pillow
+except ImportError: PILImage = None
 from mathutils import Vector
+from bpy_extras.object_utils import world_to_camera_view
+# 纯数据层 (不依赖 bpy) 放在同目录的 pbr_planner.py; 作为脚本运行时插件目录不一定在 sys.path 中
+try: import pbr_planner
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import pbr_planner
+from pbr_planner import (
+    COLOR_CHANNELS, PBR_GROUP_NAME, PBR_PREVIEW_GROUP_NAME, TEXTURE_EXTENSIONS,
+    classify_texture_stem, group_flat_files, is_high_bit_depth, iter_files_with_depth, new_plan_pool, plan_groups,
+    plan_node_graph, plan_texture_set, read_image_bit_depth, read_image_size, root_ignore_rules, scan_directory,
+    scan_summary, texture_stem_prefix,
+)
 
 # =============================================================================
 # 全局工具函数
 # =============================================================================
 
-def scan_files_with_depth(root_path, depth, extensions):
-    """递归扫描指定目录深度的文件"""
-    root_path = os.path.abspath(root_path)
-    root_depth = root_path.rstrip(os.path.sep).count(os.path.sep)
-    found_groups = []
-    
-    # 遍历目录树
-    for root, dirs, files in os.walk(root_path):
-        current_depth = root.rstrip(os.path.sep).count(os.path.sep) - root_depth
-        
-        # 达到指定深度停止递归
-        if current_depth >= depth:
-            del dirs[:]
-            
-        # 筛选符合后缀的文件
-        valid_files = [os.path.join(root, f) for f in files if f.lower().endswith(extensions)]
-        if valid_files:
-            folder_name = os.path.basename(root) or os.path.basename(root_path)
-            found_groups.append((folder_name, valid_files))
-    return found_groups
-
-def create_preview_geometry(name, location, material):
-    """创建预览用的几何体 (平面 + 球体)"""
-    # 1. 创建平面
-    bpy.ops.mesh.primitive_plane_add(size=2.0, location=(location[0], location[1], 0))
-    plane = bpy.context.active_object
-    plane.name = f"{name}_Plane"
-    if material: plane.data.materials.append(material)
-
-    # 2. 创建球体
-    bpy.ops.mesh.primitive_uv_sphere_add(radius=0.6, location=(location[0], location[1], 0.6))
-    sphere = bpy.context.active_object
-    sphere.name = f"{name}_Sphere"
-    bpy.ops.object.shade_smooth()
-    if material: sphere.data.materials.append(material)
-    
-    return plane, sphere
+PREVIEW_COLLECTION = "PBR_Previews"
+PREVIEW_PLANE_MESH = "PBR_Preview_Plane"
+PREVIEW_SPHERE_MESH = "PBR_Preview_Sphere"
+
+def _preview_plane_mesh():
+    """共享预览平面网格 (2x2, 带 UV 与一个材质槽)"""
+    mesh = bpy.data.meshes.get(PREVIEW_PLANE_MESH)
+    if mesh: return mesh
+    mesh = bpy.data.meshes.new(PREVIEW_PLANE_MESH)
+    mesh.from_pydata([(-1, -1, 0), (1, -1, 0), (1, 1, 0), (-1, 1, 0)], [], [(0, 1, 2, 3)])
+    mesh.uv_layers.new().data.foreach_set("uv", (0, 0, 1, 0, 1, 1, 0, 1))
+    mesh.materials.append(None)
+    return mesh
+
+def _preview_sphere_mesh():
+    """共享预览球体网格 (半径 0.6, 平滑着色, 带 UV 与一个材质槽)"""
+    mesh = bpy.data.meshes.get(PREVIEW_SPHERE_MESH)
+    if mesh: return mesh
+    mesh = bpy.data.meshes.new(PREVIEW_SPHERE_MESH)
+    bm = bmesh.new()
+    bm.loops.layers.uv.new()
+    try: bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=0.6, calc_uvs=True)
+    except TypeError: bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, diameter=0.6, calc_uvs=True)  # 3.0 之前参数名为 diameter (实为半径)
+    bm.to_mesh(mesh)
+    bm.free()
+    mesh.polygons.foreach_set("use_smooth", [True] * len(mesh.polygons))
+    mesh.materials.append(None)
+    return mesh
+
+def preview_collection(scene, clear=False):
+    """预览专用集合 (不存在时创建并链接到场景), clear 时删除其中已有的预览物体"""
+    col = bpy.data.collections.get(PREVIEW_COLLECTION)
+    if not col: col = bpy.data.collections.new(PREVIEW_COLLECTION)
+    if col.name not in scene.collection.children: scene.collection.children.link(col)
+    if clear and col.objects: bpy.data.batch_remove(list(col.objects))
+    return col
+
+def create_preview_geometry(name, location, material, collection=None):
+    """创建预览用的几何体 (平面 + 球体): 共享网格, 材质链接在物体上"""
+    collection = collection or preview_collection(bpy.context.scene)
+    objects = []
+    for suffix, mesh, z in (("Plane", _preview_plane_mesh(), 0), ("Sphere", _preview_sphere_mesh(), 0.6)):
+        obj = bpy.data.objects.new(f"{name}_{suffix}", mesh)
+        obj.location = (location[0], location[1], z)
+        collection.objects.link(obj)
+        obj.material_slots[0].link = 'OBJECT'
+        obj.material_slots[0].material = material
+        objects.append(obj)
+    return tuple(objects)
 
 # =============================================================================
 # 功能 1：PBR 导入
 # =============================================================================
 
-# 贴图后缀名关键字映射
-texture_type_mapping = {
-    "_c": "BaseColor", "_n": "Normal", "_e": "Emission", "_ao": "AmbientOcclusion",
-    "_r": "Roughness", "_m": "Metallic", "_arm": "ARM", "_d": "Displacement",
-    "_h": "Displacement", "_o": "Alpha", "base": "BaseColor", "color": "BaseColor",
-    "diffuse": "BaseColor", "albedo": "BaseColor", "col": "BaseColor",
-    "emissive": "Emission", "emission": "Emission", "metallic": "Metallic",
-    "metalness": "Metallic", "roughness": "Roughness", "normal": "Normal",
-    "nrm": "Normal", "bump": "Bump", "height": "Displacement",
-    "displacement": "Displacement", "disp": "Displacement", "opacity": "Alpha",
-    "alpha": "Alpha", "ao": "AmbientOcclusion",
+# 图片去重: 按文件内容哈希复用已加载的图片数据块 (符号链接/拷贝/共享贴图只上传一次)
+IMAGE_KEY_PROP = "pbr_content_key"
+HASH_MAX_WORKERS = 8
+_hash_pool = None
+_hash_memo = {}  # (realpath, size, mtime) -> 内容哈希
+
+def _hash_file(path):
+    """按 (realpath, 大小, 修改时间) 缓存的 blake2b 内容哈希"""
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    memo_key = (real, st.st_size, st.st_mtime_ns)
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        with open(real, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+        digest = _hash_memo[memo_key] = f"{st.st_size:x}-{h.hexdigest()}"
+    return digest
+
+HASH_SAMPLE = 64 << 10  # 快速摘要每段采样字节数
+
+def _quick_digest(path):
+    """快速内容摘要: 文件大小 + 头/中/尾各 HASH_SAMPLE 字节的哈希 (小文件读全文), 同样按修改时间缓存
+    
+    只用于找出疑似重复的文件, 复用前再用 same_content 读全文确认
+    """
+    real = os.path.realpath(path)
+    st = os.stat(real)
+    memo_key = (real, st.st_size, st.st_mtime_ns, "quick")
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.blake2b(digest_size=16)
+        with open(real, "rb") as f:
+            if st.st_size <= HASH_SAMPLE * 3: h.update(f.read())
+            else:
+                for offset in (0, st.st_size // 2 - HASH_SAMPLE // 2, st.st_size - HASH_SAMPLE):
+                    f.seek(offset)
+                    h.update(f.read(HASH_SAMPLE))
+        digest = _hash_memo[memo_key] = f"{st.st_size:x}-q{h.hexdigest()}"
+    return digest
+
+def hash_texture_files(paths, quick=False):
+    """在线程池中并行计算文件内容哈希: path -> digest (读取失败为 None); quick 时只读取采样计算快速摘要"""
+    global _hash_pool
+    if _hash_pool is None: _hash_pool = ThreadPoolExecutor(max_workers=HASH_MAX_WORKERS, thread_name_prefix="pbr_hash")
+    func = _quick_digest if quick else _hash_file
+    def safe(p):
+        try: return func(p)
+        except OSError: return None
+    return dict(zip(paths, _hash_pool.map(safe, paths)))
+
+def same_content(a, b):
+    """两个文件内容是否完全相同 (快速摘要相同后调用, 只有疑似重复的文件才读全文)"""
+    if os.path.realpath(a) == os.path.realpath(b): return True
+    digests = hash_texture_files([a, b])
+    return digests[a] is not None and digests[a] == digests[b]
+
+def estimate_image_bytes(path):
+    """估算图片加载后的内存占用 (8 位 RGBA 或高位深浮点 RGBA)"""
+    size = read_image_size(path)
+    if not size: return 0
+    return size[0] * size[1] * (16 if is_high_bit_depth(path) else 4)
+
+def new_image_cache():
+    """创建去重缓存: 索引当前文件中已带内容标记的图片"""
+    index = {img[IMAGE_KEY_PROP]: img for img in bpy.data.images if IMAGE_KEY_PROP in img}
+    return {"index": index, "reused": 0, "saved_bytes": 0}
+
+def image_cache_summary(image_cache):
+    """去重统计的附加报告文本"""
+    if not image_cache or not image_cache["reused"]: return ""
+    return f" | 复用 {image_cache['reused']} 张图片, 约节省 {image_cache['saved_bytes'] / (1 << 20):.0f} MB"
+
+# 延迟加载: 先用 1x1 占位图构建节点树, 物体可见或开始渲染时才从磁盘读取像素
+LAZY_PROP = "pbr_lazy"
+_lazy_state = {"pending": 0, "busy": False}
+
+def new_lazy_image(texture_path):
+    """创建指向贴图路径但不读取文件的占位图片"""
+    image = bpy.data.images.new(os.path.basename(texture_path), width=1, height=1)
+    image.filepath_raw = texture_path  # filepath_raw 不触发重新加载
+    image[LAZY_PROP] = True
+    _lazy_state["pending"] += 1
+    return image
+
+def resolve_lazy_image(image):
+    """占位图片切换为文件来源并读取像素"""
+    if LAZY_PROP not in image: return False
+    del image[LAZY_PROP]
+    image.source = 'FILE'
+    try: image.reload()
+    except RuntimeError as e: print(f"延迟加载失败 {image.filepath}: {e}")
+    _lazy_state["pending"] = max(0, _lazy_state["pending"] - 1)
+    return True
+
+def material_images(material):
+    """材质节点树中的所有图片"""
+    if not material or not material.node_tree: return []
+    return [n.image for n in material.node_tree.nodes if n.type == 'TEX_IMAGE' and n.image]
+
+def resolve_object_images(obj):
+    """加载物体所用材质中的延迟图片, 返回加载数量"""
+    count = 0
+    for slot in getattr(obj, "material_slots", ()):
+        for image in material_images(slot.material):
+            if resolve_lazy_image(image): count += 1
+    return count
+
+def resolve_all_lazy_images():
+    """加载当前文件中所有延迟图片"""
+    count = sum(resolve_lazy_image(img) for img in list(bpy.data.images) if LAZY_PROP in img)
+    _lazy_state["pending"] = 0
+    return count
+
+@bpy.app.handlers.persistent
+def _lazy_depsgraph_handler(scene, depsgraph=None):
+    """物体被赋予材质或变为可见时加载其贴图"""
+    if not _lazy_state["pending"] or _lazy_state["busy"] or depsgraph is None: return
+    _lazy_state["busy"] = True  # 加载图片会再次触发依赖图更新
+    try:
+        objects, meshes = set(), set()
+        for update in depsgraph.updates:
+            id_ = getattr(update.id, "original", None)
+            if isinstance(id_, bpy.types.Object): objects.add(id_)
+            elif isinstance(id_, bpy.types.Mesh): meshes.add(id_)  # 材质追加到网格数据上
+        if meshes: objects.update(o for o in scene.objects if o.data in meshes)
+        for obj in objects:
+            # 预热物体只用于编译着色器, 占位图不影响编译结果, 不为它加载贴图
+            if obj.visible_get() and obj.name != WARMUP_OBJECT: resolve_object_images(obj)
+    finally:
+        _lazy_state["busy"] = False
+
+@bpy.app.handlers.persistent
+def _lazy_render_handler(scene, *args):
+    """渲染开始前加载参与渲染物体的贴图"""
+    if not _lazy_state["pending"]: return
+    for obj in scene.objects:
+        if not obj.hide_render: resolve_object_images(obj)
+
+@bpy.app.handlers.persistent
+def _lazy_load_post_handler(*args):
+    """打开文件后重新统计延迟图片"""
+    _lazy_state["pending"] = sum(1 for img in bpy.data.images if LAZY_PROP in img)
+
+_LAZY_HANDLERS = (
+    ("depsgraph_update_post", _lazy_depsgraph_handler),
+    ("render_init", _lazy_render_handler),
+    ("load_post", _lazy_load_post_handler),
+)
+
+class ResolveLazyImagesOperator(bpy.types.Operator):
+    bl_idname = "spio.resolve_lazy_images"
+    bl_label = "加载全部延迟贴图"
+    bl_description = "立即读取所有延迟加载的贴图像素"
+
+    def execute(self, context):
+        self.report({'INFO'}, f"已加载 {resolve_all_lazy_images()} 张贴图")
+        return {'FINISHED'}
+
+# 并行解码: 线程池用 Pillow 解码 8 位贴图 (解码与格式转换期间释放 GIL), 主线程只创建图片并写入像素
+DECODED_PROP = "pbr_decoded"  # 图片属性: 像素来自后台解码, 值为贴图路径
+DECODE_MAX_WORKERS = os.cpu_count() or 4
+DECODE_LOOKAHEAD = 4  # 提前解码的贴图组数
+DECODE_MAX_BYTES = 2 << 30  # 已提交但主线程尚未取用的像素上限 (按 8 位 RGBA 估算)
+_decode_pool = None
+_decode_state = {"futures": {}, "sizes": {}, "bytes": 0, "decoded": 0}
+
+def _decode_pixels(path):
+    """解码为 Blender 像素顺序 (自下而上) 的 (h, w, 4) uint8 数组, 取用时才转为浮点"""
+    with PILImage.open(path) as im:
+        return np.asarray(im.convert("RGBA"))[::-1]
+
+def can_decode(path):
+    """Pillow 可用且为 8 位贴图 (高位深与 EXR 交给 Blender 加载为浮点)"""
+    depth = read_image_bit_depth(path)
+    return PILImage is not None and bool(depth) and depth <= 8
+
+def prefetch_pixels(paths, force=False):
+    """提交后台解码任务 (已提交或不支持的跳过); 在途像素超过 DECODE_MAX_BYTES 时不再提交, force 除外"""
+    global _decode_pool
+    if PILImage is None: return
+    if _decode_pool is None: _decode_pool = ThreadPoolExecutor(max_workers=DECODE_MAX_WORKERS, thread_name_prefix="pbr_decode")
+    futures = _decode_state["futures"]
+    for p in paths:
+        if not p or p in futures or not can_decode(p): continue
+        dims = read_image_size(p)
+        nbytes = dims[0] * dims[1] * 4 if dims else 0
+        if not force and _decode_state["bytes"] + nbytes > DECODE_MAX_BYTES: continue
+        futures[p] = _decode_pool.submit(_decode_pixels, p)
+        _decode_state["sizes"][p] = nbytes
+        _decode_state["bytes"] += nbytes
+
+def _take_decode(path):
+    """取出解码任务并释放其在途字节数"""
+    _decode_state["bytes"] -= _decode_state["sizes"].pop(path, 0)
+    return _decode_state["futures"].pop(path, None)
+
+def discard_pixels(paths):
+    """丢弃不再需要的解码任务/结果"""
+    for p in paths:
+        future = _take_decode(p)
+        if future: future.cancel()
+
+def prefetch_groups(planned, wanted=None):
+    """已规划的贴图组迭代器: 提前为后续几组提交解码任务, 使解码与主线程创建材质重叠
+    
+    wanted(name, files, spec) 返回 False 的组 (如增量导入中未变化的组) 不提前解码
+    """
+    pending = deque()
+    for name, files, spec in planned:
+        if wanted is None or wanted(name, files, spec): prefetch_pixels(p for p in spec["channels"].values() if p not in spec["tiles"])
+        pending.append((name, files, spec))
+        while pending and (len(pending) > DECODE_LOOKAHEAD or _decode_state["bytes"] >= DECODE_MAX_BYTES):
+            yield pending.popleft()
+    while pending: yield pending.popleft()
+
+def new_decoded_image(path):
+    """用后台解码的像素创建图片 (未提交的任务立即提交并等待), 不支持或失败时退回普通加载"""
+    prefetch_pixels([path], force=True)
+    future = _take_decode(path)
+    try: pixels = future.result() if future else None
+    except Exception as e:
+        print(f"解码失败 {path}: {e}")
+        pixels = None
+    if pixels is None: return bpy.data.images.load(path)
+    h, w = pixels.shape[:2]
+    image = bpy.data.images.new(os.path.basename(path), width=w, height=h, alpha=True)
+    image.pixels.foreach_set((pixels.astype(np.float32) * np.float32(1 / 255)).ravel())
+    image[DECODED_PROP] = path
+    _decode_state["decoded"] += 1
+    return image
+
+def restore_decoded_images():
+    """解码图片切换为文件来源, 使 .blend 中保存的是贴图路径而不是生成图"""
+    for image in bpy.data.images:
+        if DECODED_PROP not in image: continue
+        image.filepath_raw = image[DECODED_PROP]
+        del image[DECODED_PROP]
+        image.source = 'FILE'
+
+@bpy.app.handlers.persistent
+def _decode_save_handler(*args):
+    restore_decoded_images()  # 保存后如需要会按需从磁盘重新读取
+
+_DECODE_HANDLERS = (
+    ("save_pre", _decode_save_handler),
+    ("load_post", _decode_save_handler),
+)
+
+# 视口代理: 后台 Blender 进程生成低分辨率副本 (按内容哈希缓存到磁盘), 渲染时自动切换回原图
+PROXY_FULL_PROP = "pbr_full_path"
+PROXY_PATH_PROP = "pbr_proxy_path"
+PROXY_MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+_proxy_state = {"procs": [], "waiting": {}}  # waiting: 代理路径 -> [图片名]
+
+# 代理生成进程 (blender -b) 执行的脚本: 读取任务列表, 缩放后保存
+_PROXY_WORKER_SCRIPT = """
+import bpy, json, os, sys
+for src, dst, size in json.load(open(sys.argv[sys.argv.index("--") + 1], encoding="utf-8")):
+    try:
+        img = bpy.data.images.load(src)
+        w, h = img.size
+        scale = size / max(w, h)
+        img.scale(max(1, round(w * scale)), max(1, round(h * scale)))
+        img.file_format = 'OPEN_EXR' if dst.endswith('.exr') else 'PNG'
+        img.filepath_raw = dst + ".part"
+        img.save()
+        os.replace(dst + ".part", dst)
+        bpy.data.images.remove(img)
+    except Exception as e: print(f"代理生成失败 {src}: {e}")
+"""
+
+def cache_dir(name):
+    """派生资源缓存目录 (用户数据目录下)"""
+    path = os.path.join(bpy.utils.user_resource('DATAFILES'), name)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def proxy_cache_dir():
+    return cache_dir("pbr_proxy_cache")
+
+def image_source_path(image):
+    """图片对应的原始文件路径 (已代理时返回原图)"""
+    return image.get(PROXY_FULL_PROP) or image.get(DECODED_PROP) or bpy.path.abspath(image.filepath_raw)
+
+def _point_image_to(image, path):
+    """切换图片文件路径: 延迟图片只改路径, 已加载图片随之重新读取"""
+    if LAZY_PROP in image: image.filepath_raw = path
+    elif image.filepath_raw != path: image.filepath = path
+
+def proxy_file_path(full_path, digest, size):
+    """缩小版本在缓存中的路径: 内容哈希 + 长边尺寸 (EXR 保持 EXR)"""
+    return os.path.join(proxy_cache_dir(), f"{digest}_{size}{'.exr' if full_path.lower().endswith('.exr') else '.png'}")
+
+def set_image_proxy(image, full_path, proxy_path):
+    image[PROXY_FULL_PROP] = full_path
+    image[PROXY_PATH_PROP] = proxy_path
+    if DECODED_PROP in image:
+        # 解码图片 (生成图) 改为指向代理文件的文件图片, 丢弃全分辨率像素
+        del image[DECODED_PROP]
+        image.filepath_raw = proxy_path
+        image.source = 'FILE'
+        return
+    _point_image_to(image, proxy_path)
+
+def queue_texture_proxies(images, size):
+    """为大于 size 的图片指定代理: 缓存命中立即切换, 否则交给后台进程生成; 返回 (命中数, 排队数)"""
+    sources = {}
+    for image in images:
+        if PROXY_FULL_PROP in image or (image.source != 'FILE' and LAZY_PROP not in image and DECODED_PROP not in image): continue
+        full = image_source_path(image)
+        dims = read_image_size(full)
+        if dims and max(dims) > size: sources.setdefault(full, []).append(image)
+    
+    hits, jobs = 0, []
+    for full, digest in hash_texture_files(list(sources)).items():
+        if not digest: continue
+        proxy = proxy_file_path(full, digest, size)
+        if os.path.exists(proxy):
+            for image in sources[full]: set_image_proxy(image, full, proxy)
+            hits += 1
+            continue
+        if proxy not in _proxy_state["waiting"]: jobs.append((full, proxy, size))
+        _proxy_state["waiting"].setdefault(proxy, []).extend((img.name, full) for img in sources[full])
+    
+    # 任务按进程数分片, 每个进程一个 blender -b
+    for i in range(min(PROXY_MAX_WORKERS, len(jobs))):
+        job_file = os.path.join(proxy_cache_dir(), f"jobs_{os.getpid()}_{time.time_ns()}_{i}.json")
+        with open(job_file, "w", encoding="utf-8") as f: json.dump(jobs[i::PROXY_MAX_WORKERS], f)
+        proc = subprocess.Popen([bpy.app.binary_path, "-b", "--factory-startup", "--python-expr", _PROXY_WORKER_SCRIPT, "--", job_file],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _proxy_state["procs"].append((proc, job_file))
+    if jobs and not bpy.app.timers.is_registered(_proxy_poll): bpy.app.timers.register(_proxy_poll, first_interval=1.0)
+    return hits, len(jobs)
+
+def _proxy_poll():
+    """计时器回调: 把已生成的代理应用到等待中的图片"""
+    for proxy in [p for p in _proxy_state["waiting"] if os.path.exists(p)]:
+        for name, full in _proxy_state["waiting"].pop(proxy):
+            image = bpy.data.images.get(name)
+            if image: set_image_proxy(image, full, proxy)
+    
+    running = []
+    for proc, job_file in _proxy_state["procs"]:
+        if proc.poll() is None: running.append((proc, job_file))
+        else:
+            try: os.remove(job_file)
+            except OSError: pass
+    _proxy_state["procs"] = running
+    if running: return 1.0
+    _proxy_state["waiting"].clear()  # 进程已全部结束, 剩余为生成失败的任务
+    return None
+
+def swap_proxies(full_res):
+    """所有代理图片切换到原图 (full_res=True) 或代理"""
+    for image in bpy.data.images:
+        if PROXY_FULL_PROP in image:
+            _point_image_to(image, image[PROXY_FULL_PROP] if full_res else image[PROXY_PATH_PROP])
+
+@bpy.app.handlers.persistent
+def _proxy_render_pre(*args):
+    swap_proxies(True)
+
+@bpy.app.handlers.persistent
+def _proxy_render_post(*args):
+    swap_proxies(False)
+
+@bpy.app.handlers.persistent
+def _proxy_save_pre(*args):
+    for image in bpy.data.images:
+        if PROXY_FULL_PROP in image: image.filepath_raw = image[PROXY_FULL_PROP]
+
+@bpy.app.handlers.persistent
+def _proxy_save_post(*args):
+    for image in bpy.data.images:
+        if PROXY_FULL_PROP in image: image.filepath_raw = image[PROXY_PATH_PROP]
+
+@bpy.app.handlers.persistent
+def _proxy_load_post(*args):
+    """打开文件后: 本机有代理缓存的图片重新指向代理, 没有的 (如在其他机器上) 去掉代理标记"""
+    for image in bpy.data.images:
+        if PROXY_FULL_PROP not in image: continue
+        if os.path.exists(image[PROXY_PATH_PROP]): image.filepath_raw = image[PROXY_PATH_PROP]
+        else:
+            del image[PROXY_FULL_PROP]
+            del image[PROXY_PATH_PROP]
+
+# render_pre 换原图; 整个渲染 (含动画) 结束或取消后再换回代理, 避免逐帧重复读取
+# 保存时只改写路径 (不重新读取): .blend 中记录原图路径, 其他机器/渲染农场没有本机的代理缓存
+_PROXY_HANDLERS = (
+    ("render_pre", _proxy_render_pre),
+    ("render_complete", _proxy_render_post),
+    ("render_cancel", _proxy_render_post),
+    ("save_pre", _proxy_save_pre),
+    ("save_post", _proxy_save_post),
+    ("load_post", _proxy_load_post),
+)
+
+# 通道打包: 分离的 AO/粗糙度/金属度合成一张 ARM, 不透明度写入 BaseColor 的 Alpha (结果缓存到磁盘)
+def _read_pixels(path, size=None, colorspace=None):
+    """临时加载图片并读出 (h, w, 4) float32 像素, 可缩放到指定尺寸"""
+    image = bpy.data.images.load(path, check_existing=False)
+    try:
+        if colorspace: image.colorspace_settings.name = colorspace
+        if size and tuple(image.size) != tuple(size): image.scale(*size)
+        w, h = image.size
+        pixels = np.empty(w * h * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+        return pixels.reshape(h, w, 4)
+    finally: bpy.data.images.remove(image)
+
+def _write_pixels(pixels, path):
+    """(h, w, 4) 像素保存为 8 位 PNG (先写临时文件再替换)"""
+    h, w = pixels.shape[:2]
+    image = bpy.data.images.new("pbr_pack", width=w, height=h, alpha=True)
+    try:
+        image.pixels.foreach_set(np.clip(pixels, 0.0, 1.0).ravel())
+        image.file_format = 'PNG'
+        image.filepath_raw = path + ".part"
+        image.save()
+        os.replace(path + ".part", path)
+    finally: bpy.data.images.remove(image)
+
+def _packed_path(kind, sources):
+    """打包结果的缓存路径: 由输入文件内容哈希决定"""
+    digests = hash_texture_files(sources)
+    if not all(digests.values()): return None
+    h = hashlib.blake2b("|".join(digests[p] for p in sources).encode(), digest_size=16)
+    return os.path.join(cache_dir("pbr_derived_cache"), f"{h.hexdigest()}_{kind}.png")
+
+def pack_texture_channels(ordered_files, tiled=()):
+    """打包通道并返回新的文件表: 成功时 ARM 取代 AO/R/M, Alpha 指向 BaseColor 本身 (UDIM 序列不打包)
+    
+    数据通道按 Non-Color 读取原值; 高位深 BaseColor 读出为线性浮点, 写入 8 位 PNG 前编码为 sRGB
+    """
+    files = dict(ordered_files)
+    ao, rough, metal = files.get("AmbientOcclusion"), files.get("Roughness"), files.get("Metallic")
+    if rough and metal and not files.get("ARM") and not {ao, rough, metal} & set(tiled):
+        sources = [p for p in (ao, rough, metal) if p]
+        dst = _packed_path("arm_v2", sources)  # v2: 按 Non-Color 读取, 不复用旧的错误缓存
+        try:
+            if dst and not os.path.exists(dst):
+                r_px = _read_pixels(rough, colorspace='Non-Color')
+                size = r_px.shape[1::-1]
+                arm = np.empty_like(r_px)
+                arm[..., 0] = _read_pixels(ao, size, 'Non-Color')[..., 0] if ao else 1.0
+                arm[..., 1] = r_px[..., 0]
+                arm[..., 2] = _read_pixels(metal, size, 'Non-Color')[..., 0]
+                arm[..., 3] = 1.0
+                _write_pixels(arm, dst)
+            if dst: files.update(ARM=dst, AmbientOcclusion=None, Roughness=None, Metallic=None)
+        except (RuntimeError, OSError) as e: print(f"ARM 打包失败 {rough}: {e}")
+    
+    base, opacity = files.get("BaseColor"), files.get("Alpha")
+    if base and opacity and base not in tiled and opacity not in tiled:
+        dst = _packed_path("basecolor_alpha_v2", [base, opacity])
+        try:
+            if dst and not os.path.exists(dst):
+                color = _read_pixels(base)
+                if is_high_bit_depth(base): color[..., :3] = _linear_to_srgb(color[..., :3])
+                color[..., 3] = _read_pixels(opacity, color.shape[1::-1], 'Non-Color')[..., 0]
+                _write_pixels(color, dst)
+            if dst: files.update(BaseColor=dst, Alpha=dst)
+        except (RuntimeError, OSError) as e: print(f"Alpha 打包失败 {base}: {e}")
+    return files
+
+# 位深策略: 只有需要精度的通道保留浮点, 其余高位深贴图转换为缓存的 8 位 PNG
+BIT_DEPTH_FLOAT_CHANNELS = {
+    'KEEP': None,
+    'DISPLACEMENT': ("Displacement",),
+    'GEOMETRY': ("Displacement", "Normal", "Bump"),
+    'NONE': (),
 }
 
-def load_texture_node(material, texture_path, label, location, is_color=True):
-    """加载图片节点并应用色彩空间设置"""
-    nodes = material.node_tree.nodes
-    node = nodes.new(type='ShaderNodeTexImage')
-    try: node.image = bpy.data.images.load(texture_path)
-    except: return node
+def new_depth_policy(mode):
+    """创建位深策略与统计, mode 为 KEEP 时返回 None (不转换)"""
+    keep = BIT_DEPTH_FLOAT_CHANNELS.get(mode)
+    if keep is None: return None
+    return {"mode": mode, "keep": set(keep), "converted": 0, "saved_bytes": 0}
+
+def depth_policy_summary(depth_policy):
+    """位深转换统计的附加报告文本"""
+    if not depth_policy or not depth_policy["converted"]: return ""
+    return f" | {depth_policy['converted']} 张高位深贴图转为 8 位, 约节省 {depth_policy['saved_bytes'] / (1 << 20):.0f} MB"
+
+def _linear_to_srgb(c):
+    return np.where(c <= 0.0031308, c * 12.92, 1.055 * np.power(np.maximum(c, 0.0031308), 1 / 2.4) - 0.055)
+
+def convert_to_8bit(path, is_color):
+    """高位深贴图转为 8 位 PNG 并缓存 (颜色通道编码为 sRGB, 数据通道保持原值), 返回新路径"""
+    dst = _packed_path("8bit_color" if is_color else "8bit_data", [path])
+    if dst and not os.path.exists(dst):
+        pixels = _read_pixels(path, colorspace=None if is_color else 'Non-Color')
+        if is_color: pixels[..., :3] = _linear_to_srgb(pixels[..., :3])
+        _write_pixels(pixels, dst)
+    return dst
+
+def apply_bit_depth_policy(ordered_files, depth_policy, tiled=(), label=""):
+    """按策略把不需要浮点精度的高位深通道替换为 8 位版本, 返回新的文件表"""
+    files = dict(ordered_files)
+    converted = saved = 0
+    for t_type, path in ordered_files.items():
+        if not path or t_type in depth_policy["keep"] or path in tiled or not is_high_bit_depth(path): continue
+        try: dst = convert_to_8bit(path, t_type in COLOR_CHANNELS)
+        except (RuntimeError, OSError) as e:
+            print(f"位深转换失败 {path}: {e}")
+            continue
+        if not dst: continue
+        files[t_type] = dst
+        converted += 1
+        saved += estimate_image_bytes(path) - estimate_image_bytes(dst)
+    if converted:
+        depth_policy["converted"] += converted
+        depth_policy["saved_bytes"] += saved
+        print(f"[位深] {label}: {converted} 张转为 8 位, 约节省 {saved / (1 << 20):.1f} MB")
+    return files
+
+def load_tiled_image(first_tile_path, tiles):
+    """以首个分块加载 UDIM 序列为单张 TILED 图片 (旧版 Blender 退回单张图片)"""
+    image = bpy.data.images.load(first_tile_path)
+    if not hasattr(image, "tiles"): return image
+    image.source = 'TILED'
+    for number in tiles:
+        if not image.tiles.get(number): image.tiles.new(tile_number=number)
+    image.reload()
+    return image
+
+def _content_key(image_cache, digest, is_color):
+    """去重键: 同内容 + 同色彩空间才可复用; 未启用去重或没有摘要时为 None"""
+    return f"{digest}:{'color' if is_color else 'data'}" if image_cache is not None and digest else None
+
+def load_texture_image(texture_path, is_color=True, image_cache=None, digest=None, lazy=False, tiles=None, decode=False):
+    """加载贴图图片并应用色彩空间设置, 失败返回 None
     
-    node.label = label
-    node.location = location
+    提供 image_cache 与内容哈希时复用相同内容的图片; lazy 时只创建占位图, 首次使用时再读取;
+    tiles 为 UDIM 分块编号时整个序列加载为一张 TILED 图片; decode 时使用后台线程解码的像素
+    """
+    key = _content_key(image_cache, digest, is_color)
+    cached = _live(image_cache["index"].get(key)) if key else None  # 图片可能已被删除
+    if cached:
+        # 快速摘要相同: 读全文确认后复用, 内容不同 (采样碰撞) 时按新图片加载且不登记
+        if same_content(texture_path, image_source_path(cached)):
+            image_cache["reused"] += 1
+            image_cache["saved_bytes"] += estimate_image_bytes(texture_path)
+            return cached
+        key = None
+    try:
+        if tiles: image = load_tiled_image(texture_path, tiles)
+        elif lazy: image = new_lazy_image(texture_path)
+        elif decode: image = new_decoded_image(texture_path)
+        else: image = bpy.data.images.load(texture_path)
+    except: return None
+    if key:
+        image[IMAGE_KEY_PROP] = key
+        image_cache["index"][key] = image
     
     # 设置非彩色数据 (如法向、粗糙度)
-    if not is_color and hasattr(node.image, 'colorspace_settings'):
-        node.image.colorspace_settings.is_data = True
-        try: node.image.colorspace_settings.name = 'Non-Color'
+    if not is_color and hasattr(image, 'colorspace_settings'):
+        image.colorspace_settings.is_data = True
+        try: image.colorspace_settings.name = 'Non-Color'
         except: pass 
+    return image
+
+def load_texture_node(material, texture_path, label, location, is_color=True, image_cache=None, digest=None, lazy=False, tiles=None, decode=False):
+    """创建图片节点并加载贴图 (参数同 load_texture_image)"""
+    node = material.node_tree.nodes.new(type='ShaderNodeTexImage')
+    node.label = label
+    node.location = location
+    image = load_texture_image(texture_path, is_color, image_cache, digest, lazy, tiles, decode)
+    if image: node.image = image
+    return node
+
+# 共享主节点组: 原理化 BSDF 与法线/凹凸/置换/ARM 连线只在组内构建一次, 材质只保留贴图节点 + 组节点
+# 修改组内连线时提升版本号 (名称 PBR_GROUP_NAME 在 pbr_planner 中; 新版本使用新名称, 旧文件中的材质保持不变)
+PBR_GROUP_INPUTS = (
+    ("Base Color", 'NodeSocketColor', (0.8, 0.8, 0.8, 1.0)),
+    ("Alpha", 'NodeSocketFloat', 1.0),
+    ("Metallic", 'NodeSocketFloat', 0.0),
+    ("Roughness", 'NodeSocketFloat', 0.5),
+    ("ARM", 'NodeSocketColor', (1.0, 0.5, 0.0, 1.0)),
+    ("ARM Factor", 'NodeSocketFloat', 0.0),  # 1 时粗糙度/金属度取 ARM 的 G/B 通道
+    ("Emission", 'NodeSocketColor', (0.0, 0.0, 0.0, 1.0)),
+    ("Normal", 'NodeSocketColor', (0.5, 0.5, 1.0, 1.0)),
+    ("Bump", 'NodeSocketFloat', 0.0),
+    ("Displacement", 'NodeSocketFloat', 0.5),  # 默认等于中间值, 即无置换
+)
+
+def _new_group_socket(tree, in_out, socket_type, name, default=None):
+    """新建节点组接口插槽 (兼容 4.0 前后的接口 API)"""
+    if hasattr(tree, "interface"): socket = tree.interface.new_socket(name, in_out=in_out, socket_type=socket_type)
+    else: socket = (tree.inputs if in_out == 'INPUT' else tree.outputs).new(socket_type, name)
+    if default is not None: socket.default_value = default
+    return socket
+
+def get_pbr_master_group():
+    """获取共享 PBR 主节点组, 不存在时创建"""
+    group = bpy.data.node_groups.get(PBR_GROUP_NAME)
+    if group: return group
+    group = bpy.data.node_groups.new(PBR_GROUP_NAME, 'ShaderNodeTree')
+    for name, socket_type, default in PBR_GROUP_INPUTS: _new_group_socket(group, 'INPUT', socket_type, name, default)
+    _new_group_socket(group, 'OUTPUT', 'NodeSocketShader', "BSDF")
+    _new_group_socket(group, 'OUTPUT', 'NodeSocketVector', "Displacement")
+    nodes, links = group.nodes, group.links
+    group_in = nodes.new('NodeGroupInput')
+    group_in.location = Vector((-900, 0))
+    group_out = nodes.new('NodeGroupOutput')
+    group_out.location = Vector((500, 0))
+    principled = nodes.new('ShaderNodeBsdfPrincipled')
+    principled.location = Vector((100, 0))
+    links.new(principled.outputs['BSDF'], group_out.inputs['BSDF'])
+    links.new(group_in.outputs['Base Color'], principled.inputs['Base Color'])
+    links.new(group_in.outputs['Alpha'], principled.inputs['Alpha'])
+
+    # ARM 分离: 按 ARM Factor 在单独贴图与 ARM 通道之间切换
+    sep = nodes.new('ShaderNodeSeparateRGB')
+    sep.location = Vector((-600, -200))
+    links.new(group_in.outputs['ARM'], sep.inputs['Image'])
+    for i, (channel, target) in enumerate((('G', 'Roughness'), ('B', 'Metallic'))):
+        mix = nodes.new('ShaderNodeMixRGB')
+        mix.location = Vector((-350, -150 - 200 * i))
+        links.new(group_in.outputs['ARM Factor'], mix.inputs['Fac'])
+        links.new(group_in.outputs[target], mix.inputs['Color1'])
+        links.new(sep.outputs[channel], mix.inputs['Color2'])
+        links.new(mix.outputs['Color'], principled.inputs[target])
+
+    tgt = 'Emission Color' if 'Emission Color' in principled.inputs else 'Emission'
+    links.new(group_in.outputs['Emission'], principled.inputs[tgt])
+    if 'Emission Strength' in principled.inputs: principled.inputs['Emission Strength'].default_value = 1.0
+
+    # 法线贴图 -> 凹凸 -> BSDF (没有贴图时默认值不产生扰动)
+    norm = nodes.new('ShaderNodeNormalMap')
+    norm.location = Vector((-350, -600))
+    links.new(group_in.outputs['Normal'], norm.inputs['Color'])
+    bump = nodes.new('ShaderNodeBump')
+    bump.location = Vector((-150, -700))
+    links.new(group_in.outputs['Bump'], bump.inputs['Height'])
+    links.new(norm.outputs['Normal'], bump.inputs['Normal'])
+    links.new(bump.outputs['Normal'], principled.inputs['Normal'])
+
+    disp = nodes.new('ShaderNodeDisplacement')
+    disp.location = Vector((100, -700))
+    links.new(group_in.outputs['Displacement'], disp.inputs['Height'])
+    links.new(disp.outputs['Displacement'], group_out.inputs['Displacement'])
+    return group
+
+# 轻量预览变体: 只有基础色 + 法线, 没有置换/凹凸/自发光; 场景开关切换所有工具材质的活动输出
+def get_pbr_preview_group():
+    """获取共享预览节点组, 不存在时创建"""
+    group = bpy.data.node_groups.get(PBR_PREVIEW_GROUP_NAME)
+    if group: return group
+    group = bpy.data.node_groups.new(PBR_PREVIEW_GROUP_NAME, 'ShaderNodeTree')
+    _new_group_socket(group, 'INPUT', 'NodeSocketColor', "Base Color", (0.8, 0.8, 0.8, 1.0))
+    _new_group_socket(group, 'INPUT', 'NodeSocketColor', "Normal", (0.5, 0.5, 1.0, 1.0))
+    _new_group_socket(group, 'OUTPUT', 'NodeSocketShader', "BSDF")
+    nodes, links = group.nodes, group.links
+    group_in = nodes.new('NodeGroupInput')
+    group_in.location = Vector((-600, 0))
+    group_out = nodes.new('NodeGroupOutput')
+    group_out.location = Vector((300, 0))
+    principled = nodes.new('ShaderNodeBsdfPrincipled')
+    principled.location = Vector((0, 0))
+    norm = nodes.new('ShaderNodeNormalMap')
+    norm.location = Vector((-300, -200))
+    links.new(group_in.outputs['Base Color'], principled.inputs['Base Color'])
+    links.new(group_in.outputs['Normal'], norm.inputs['Color'])
+    links.new(norm.outputs['Normal'], principled.inputs['Normal'])
+    links.new(principled.outputs['BSDF'], group_out.inputs['BSDF'])
+    return group
+
+_PBR_GROUP_BUILDERS = {PBR_GROUP_NAME: get_pbr_master_group, PBR_PREVIEW_GROUP_NAME: get_pbr_preview_group}
+
+def set_material_preview(material, preview):
+    """切换工具材质的活动输出 (预览 / 最终), 没有预览变体的材质返回 False"""
+    if not material.node_tree: return False
+    outputs = {n.get(ROLE_PROP): n for n in material.node_tree.nodes if n.type == 'OUTPUT_MATERIAL'}
+    final, light = outputs.get("Output"), outputs.get("PreviewOutput")
+    if not final or not light: return False
+    active, inactive = (light, final) if preview else (final, light)
+    inactive.is_active_output = False
+    active.is_active_output = True
+    return True
+
+def set_all_materials_preview(preview):
+    return sum(set_material_preview(m, preview) for m in bpy.data.materials if SOURCE_PROP in m)
+
+def _update_preview_shading(self, context):
+    set_all_materials_preview(self.toolbox_preview_shading)
+
+@bpy.app.handlers.persistent
+def _shading_render_pre(scene, *args):
+    if scene.toolbox_preview_shading: set_all_materials_preview(False)  # 渲染始终使用最终材质
+
+@bpy.app.handlers.persistent
+def _shading_render_post(scene, *args):
+    if scene.toolbox_preview_shading: set_all_materials_preview(True)
+
+_SHADING_HANDLERS = (
+    ("render_pre", _shading_render_pre),
+    ("render_complete", _shading_render_post),
+    ("render_cancel", _shading_render_post),
+)
+
+# 材质规划 (MaterialSpec): 纯数据层在 pbr_planner 中 (不调用 bpy, 可在进程池中并行); 主线程只按规划创建节点
+ROLE_PROP = "pbr_role"  # 节点属性: 节点在规划中的名称
+_plan_pool = None
+
+def get_plan_pool():
+    """规划进程池 (首次使用时创建, 注销插件时关闭); 无法创建时返回 None, 由调用方就地规划"""
+    global _plan_pool
+    if _plan_pool is None: _plan_pool = new_plan_pool() or False
+    return _plan_pool or None
+
+def _new_graph_node(material, spec, image_cache, digests, lazy, decode):
+    """按节点描述创建节点, 并以 ROLE_PROP 标记供原地更新时识别"""
+    if spec["type"] == 'ShaderNodeTexImage':
+        path = spec["image"]
+        node = load_texture_node(material, path, spec["label"], Vector(spec["location"]), spec["is_color"], image_cache, digests.get(path), lazy, spec["tiles"], decode)
+    else:
+        node = material.node_tree.nodes.new(type=spec["type"])
+        node.location = Vector(spec["location"])
+        if spec.get("group"): node.node_tree = _PBR_GROUP_BUILDERS[spec["group"]]()
+    node[ROLE_PROP] = spec["name"]
     return node
 
-def create_pbr_material(material, texture_files):
-    """构建 PBR 材质节点树"""
+def apply_node_graph(material, graph, image_cache=None, digests=None, lazy=False, decode=False):
+    """在主线程按规划重建材质节点树"""
     nodes = material.node_tree.nodes
     links = material.node_tree.links
     for node in nodes: nodes.remove(node)
+    digests = digests or {}
+    created = {spec["name"]: _new_graph_node(material, spec, image_cache, digests, lazy, decode) for spec in graph["nodes"]}
+    for src, out, dst, inp in graph["links"]: links.new(created[src].outputs[out], created[dst].inputs[inp])
+    for name, inp, value in graph["values"]: created[name].inputs[inp].default_value = value
+
+def _retarget_texture_node(node, spec, image_cache, digests, lazy, decode):
+    """贴图节点改用新文件: 图片只被该节点使用时原地修改路径 (或重新读取), 否则换用新图片"""
+    path, image = spec["image"], node.image
+    if RES_SOURCE_PROP in node: del node[RES_SOURCE_PROP]  # 按相机调整过的分辨率以新文件为准
+    in_place = (image and image.users == 1 and not spec["tiles"] and DECODED_PROP not in image
+                and (image.source == 'FILE' or LAZY_PROP in image))
+    if not in_place:
+        image = load_texture_image(path, spec["is_color"], image_cache, digests.get(path), lazy, spec["tiles"], decode)
+        if image: node.image = image
+        return
+    current = os.path.normpath(bpy.path.abspath(image.filepath_raw))
+    old_key = image.get(IMAGE_KEY_PROP)
+    if image_cache is not None and old_key and image_cache["index"].get(old_key) == image: del image_cache["index"][old_key]
+    for prop in (IMAGE_KEY_PROP, PROXY_FULL_PROP, PROXY_PATH_PROP):
+        if prop in image: del image[prop]  # 内容已变化, 去重标记与代理失效
+    if current != os.path.normpath(path): _point_image_to(image, path)
+    elif LAZY_PROP not in image: image.reload()
+    # 按新内容重新登记, 本次导入中后续相同内容的贴图可复用
+    key = _content_key(image_cache, digests.get(path), spec["is_color"])
+    if key and key not in image_cache["index"]:
+        image[IMAGE_KEY_PROP] = key
+        image_cache["index"][key] = image
+
+def update_node_graph(material, graph, image_cache=None, digests=None, lazy=False, decode=False):
+    """按规划原地更新节点树: 只增删通道变化的贴图节点, 其余贴图节点改路径; 用户添加的节点与连线保持不变
+    
+    没有带标记节点的材质 (旧版本导入) 退回完整重建
+    """
+    nodes, links = material.node_tree.nodes, material.node_tree.links
+    existing = {node[ROLE_PROP]: node for node in nodes if ROLE_PROP in node}
+    if not existing: return apply_node_graph(material, graph, image_cache, digests, lazy, decode)
+    digests = digests or {}
+    created, fresh = {}, set()
+    for spec in graph["nodes"]:
+        node = existing.pop(spec["name"], None)
+        if node is None:
+            node = _new_graph_node(material, spec, image_cache, digests, lazy, decode)
+            fresh.add(spec["name"])
+        elif spec["type"] == 'ShaderNodeTexImage':
+            _retarget_texture_node(node, spec, image_cache, digests, lazy, decode)
+        created[spec["name"]] = node
+    for node in existing.values(): nodes.remove(node)  # 通道已不存在的贴图节点
+    # 只为新节点或空闲输入补连线, 不覆盖用户改过的连线
+    for src, out, dst, inp in graph["links"]:
+        socket = created[dst].inputs[inp]
+        if src in fresh or dst in fresh or not socket.is_linked: links.new(created[src].outputs[out], socket)
+    for name, inp, value in graph["values"]: created[name].inputs[inp].default_value = value
+
+
+def create_pbr_material(material, texture_files, target_size=0, image_cache=None, lazy=False, pack=False, depth_policy=None, decode=False, spec=None, update=False):
+    """构建 PBR 材质节点树
+    
+    target_size > 0 时每个通道选取最接近该分辨率的贴图; 传入 image_cache 时按内容哈希复用图片;
+    lazy 时图片延迟到首次使用再读取; pack 时先把分离通道打包为 ARM / BaseColor+Alpha;
+    传入 depth_policy 时不需要浮点精度的高位深通道改用 8 位版本; decode 时各通道在线程池中并行解码;
+    spec 为预先规划好的贴图组; update 时原地更新已有节点树而不是重建
+    """
+    # 1. 规划通道文件, 打包/位深转换会替换其中的路径
+    spec = spec or plan_texture_set(texture_files, target_size)
+    channels, tiles = spec["channels"], spec["tiles"]
+    if pack: channels = pack_texture_channels(channels, tiles)
+    if depth_policy: channels = apply_bit_depth_policy(channels, depth_policy, tiles, material.name)
+
+    # 2. UDIM 序列只以首个分块为代表, 内容哈希不能代表整个序列, 不参与去重
+    digests = hash_texture_files([p for p in channels.values() if p and p not in tiles], quick=True) if image_cache is not None else {}
+    decode = decode and not lazy
+    if decode: prefetch_pixels(p for p in channels.values() if p not in tiles)
+
+    # 3. 按规划创建节点
+    (update_node_graph if update else apply_node_graph)(material, plan_node_graph(channels, tiles), image_cache, digests, lazy, decode)
+    if decode: discard_pixels(texture_files)  # 打包/位深替换后未使用的预解码结果
+
+# 增量导入: 构建签名 (每组贴图的文件大小与修改时间) 保存在材质上, 每个工程按自己的材质判断是否需要更新
+SOURCE_PROP = "pbr_source"  # 材质 ID 属性: 生成该材质的贴图组
+ALIAS_PROP = "pbr_aliases"  # 材质 ID 属性: 内容相同而复用该材质的其他贴图组
+FINGERPRINT_PROP = "pbr_fingerprint"  # 材质 ID 属性: 贴图组内容指纹
+SIGNATURE_PROP = "pbr_signatures"  # 材质 ID 属性: 贴图组标识 (含别名) -> 构建时签名 (JSON)
+CHANNELS_PROP = "pbr_channels"  # 材质 ID 属性: 构建时各通道的贴图路径 (JSON), 用于确认重复组
+
+def material_signatures(mat):
+    """材质记录的构建签名, 缺失或损坏时为空"""
+    try: return json.loads(mat.get(SIGNATURE_PROP, "{}"))
+    except ValueError: return {}
+
+def set_material_signature(mat, key, signature):
+    """记录材质中某个贴图组的构建签名, signature 为 None 时删除"""
+    sigs = material_signatures(mat)
+    if signature is None: sigs.pop(key, None)
+    else: sigs[key] = signature
+    mat[SIGNATURE_PROP] = json.dumps(sigs, ensure_ascii=False, separators=(",", ":"))
 
-    # 1. 创建基础节点 (原理化BSDF + 输出)
-    principled = nodes.new(type='ShaderNodeBsdfPrincipled')
-    principled.location = Vector((200, -200))
-    output = nodes.new(type='ShaderNodeOutputMaterial')
-    output.location = Vector((600, -200))
-    links.new(principled.outputs['BSDF'], output.inputs['Surface'])
+def texture_set_key(name, texture_files):
+    """贴图组唯一标识: 所在文件夹 + 组名"""
+    return os.path.normpath(os.path.join(os.path.dirname(texture_files[0]), name))
 
-    # 2. 识别并整理文件列表
-    ordered_files = {key: None for key in set(texture_type_mapping.values())}
+def texture_set_signature(texture_files, target_size=0, pack=False, bit_depth='KEEP'):
+    """贴图组签名: 每个文件的大小与修改时间, 以及影响构建结果的设置"""
+    files = {}
     for f in texture_files:
-        bn = os.path.splitext(os.path.basename(f))[0].lower()
-        if "sheenopacity" in bn: continue
-        
-        # 匹配关键字
-        t_type = None
-        for k, v in texture_type_mapping.items():
-            if bn.endswith(k):
-                t_type = v
-                break
-        if not t_type: t_type = next((v for k, v in texture_type_mapping.items() if k in bn), None)
-        if t_type and ordered_files[t_type] is None: ordered_files[t_type] = f
-
-    # 3. 创建并链接贴图节点
-    offset_y = 0
-    tex_nodes = {}
-    norm_node = None 
-    order = ["BaseColor", "ARM", "Metallic", "Roughness", "Emission", "Normal", "Bump", "Alpha", "Displacement", "AmbientOcclusion"]
-
-    for t_type in order:
-        path = ordered_files.get(t_type)
-        if path:
-            is_col = t_type in ["BaseColor", "Emission"]
-            node = load_texture_node(material, path, t_type, Vector((-400, offset_y)), is_col)
-            tex_nodes[t_type] = node
-
-            # 根据类型链接到原理化节点
-            if t_type == "BaseColor":
-                links.new(node.outputs['Color'], principled.inputs['Base Color'])
-            elif t_type == "ARM": # 分离 ARM 贴图 (AO, Roughness, Metallic)
-                sep = nodes.new(type='ShaderNodeSeparateRGB')
-                sep.location = Vector((-150, offset_y - 50))
-                links.new(node.outputs['Color'], sep.inputs['Image'])
-                links.new(sep.outputs['G'], principled.inputs['Roughness'])
-                links.new(sep.outputs['B'], principled.inputs['Metallic'])
-            elif t_type == "Metallic" and "ARM" not in ordered_files:
-                links.new(node.outputs['Color'], principled.inputs['Metallic'])
-            elif t_type == "Roughness" and "ARM" not in ordered_files:
-                links.new(node.outputs['Color'], principled.inputs['Roughness'])
-            elif t_type == "Emission":
-                tgt = 'Emission Color' if 'Emission Color' in principled.inputs else 'Emission'
-                links.new(node.outputs['Color'], principled.inputs[tgt])
-                if 'Emission Strength' in principled.inputs: principled.inputs['Emission Strength'].default_value = 1.0
-            elif t_type == "Normal":
-                norm_node = nodes.new(type='ShaderNodeNormalMap')
-                norm_node.location = Vector((-150, -600)) 
-                links.new(node.outputs['Color'], norm_node.inputs['Color'])
-                links.new(norm_node.outputs['Normal'], principled.inputs['Normal'])
-            elif t_type == "Bump":
-                bump = nodes.new(type='ShaderNodeBump')
-                bump.location = Vector((-150, -800))
-                links.new(node.outputs['Color'], bump.inputs['Height'])
-                if norm_node: links.new(norm_node.outputs['Normal'], bump.inputs['Normal'])
-                links.new(bump.outputs['Normal'], principled.inputs['Normal'])
-            elif t_type == "Displacement":
-                disp = nodes.new(type='ShaderNodeDisplacement')
-                disp.location = Vector((-50, -1000))
-                links.new(node.outputs['Color'], disp.inputs['Height'])
-                links.new(disp.outputs['Displacement'], output.inputs['Displacement'])
-            elif t_type == "Alpha":
-                links.new(node.outputs['Color'], principled.inputs['Alpha'])
-            
-            offset_y -= 300 
-
-    # 4. 添加纹理坐标映射
-    tex_coord = nodes.new(type='ShaderNodeTexCoord')
-    tex_coord.location = Vector((-900, 0))
-    mapping = nodes.new(type='ShaderNodeMapping')
-    mapping.location = Vector((-700, 0))
-    links.new(tex_coord.outputs['UV'], mapping.inputs['Vector'])
+        try: st = os.stat(f)
+        except OSError: continue
+        files[f] = [st.st_size, st.st_mtime_ns]
+    return {"files": files, "target_size": target_size, "pack": pack, "bit_depth": bit_depth}
+
+def material_source_index():
+    """已导入材质索引: 贴图组标识 (含别名) -> 材质"""
+    index = {}
+    for m in bpy.data.materials:
+        if SOURCE_PROP in m: index[m[SOURCE_PROP]] = m
+        for alias in m.get(ALIAS_PROP, ()): index[alias] = m
+    return index
+
+def material_fingerprint_index():
+    """已导入材质索引: 内容指纹 -> 材质"""
+    return {m[FINGERPRINT_PROP]: m for m in bpy.data.materials if FINGERPRINT_PROP in m}
+
+def texture_set_fingerprint(channels, tiles=(), pack=False, bit_depth='KEEP'):
+    """贴图组内容指纹: 各通道文件的快速摘要 + 影响构建结果的设置; 含 UDIM 序列或读取失败时返回 None
     
-    # 连接所有纹理的矢量输入
-    for t_type in order:
-        if t_type in tex_nodes:
-            tex_nodes[t_type].location.y = -offset_y
-            offset_y += 300
-            links.new(mapping.outputs['Vector'], tex_nodes[t_type].inputs['Vector'])
+    快速摘要只读取采样, 指纹相同的组复用材质前要用 _twin_matches 逐通道确认
+    """
+    items = sorted((t, p) for t, p in channels.items() if p)
+    if not items or any(p in tiles for _, p in items): return None
+    digests = hash_texture_files([p for _, p in items], quick=True)
+    if not all(digests.values()): return None
+    text = "|".join(f"{t}={digests[p]}" for t, p in items) + f"|pack={pack}|depth={bit_depth}"
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def _live(id_):
+    """数据块引用已失效 (如监视期间材质被删除) 时返回 None"""
+    try:
+        if id_ is not None: id_.name
+        return id_
+    except ReferenceError: return None
+
+def _twin_matches(channels, twin):
+    """指纹相同的材质逐通道确认内容一致 (只读取疑似重复的文件)"""
+    try: theirs = json.loads(twin.get(CHANNELS_PROP, ""))
+    except ValueError: return False
+    mine = {t: p for t, p in channels.items() if p}
+    return set(mine) == set(theirs) and all(same_content(p, theirs[t]) for t, p in mine.items())
+
+def _remove_alias(mat, key):
+    aliases = [a for a in mat.get(ALIAS_PROP, ()) if a != key]
+    if aliases: mat[ALIAS_PROP] = aliases
+    elif ALIAS_PROP in mat: del mat[ALIAS_PROP]
+
+def texture_set_needs_build(name, files, target_size, existing, pack=False, bit_depth='KEEP', spec=None, fingerprints=None):
+    """只读预判贴图组是否需要构建材质 (既不是未变化的组也不是重复组), 用于决定是否提前解码"""
+    key = texture_set_key(name, files)
+    mat = _live(existing.get(key))
+    if mat and material_signatures(mat).get(key) == texture_set_signature(files, target_size, pack, bit_depth): return False
+    if (mat and mat.get(SOURCE_PROP) == key) or fingerprints is None: return True
+    spec = spec or plan_texture_set(files, target_size)
+    fingerprint = texture_set_fingerprint(spec["channels"], spec["tiles"], pack, bit_depth)
+    return not fingerprint or _live(fingerprints.get(fingerprint)) is None
+
+def import_texture_set(name, files, target_size, existing, image_cache=None, lazy=False, pack=False, depth_policy=None, decode=False, spec=None, fingerprints=None):
+    """增量导入单个贴图组: 新组新建材质, 有变化的组原地更新
+    
+    传入 fingerprints (指纹 -> 材质) 时, 内容与已导入组相同的新组直接复用其材质 (记为别名);
+    返回 (状态, 材质), 状态为 'created' / 'updated' / 'skipped' / 'duplicate'
+    """
+    key = texture_set_key(name, files)
+    bit_depth = depth_policy["mode"] if depth_policy else 'KEEP'
+    signature = texture_set_signature(files, target_size, pack, bit_depth)
+    mat = _live(existing.get(key))  # 索引可能在材质被删除之前建立
+    if mat and material_signatures(mat).get(key) == signature:
+        if decode: discard_pixels(files)
+        return 'skipped', mat
+    # 别名组的文件发生变化: 脱离共享材质, 作为新组导入
+    if mat and mat.get(SOURCE_PROP) != key:
+        _remove_alias(mat, key)
+        set_material_signature(mat, key, None)
+        mat = existing[key] = None
+
+    spec = spec or plan_texture_set(files, target_size)
+    fingerprint = texture_set_fingerprint(spec["channels"], spec["tiles"], pack, bit_depth) if fingerprints is not None else None
+    twin = _live(fingerprints.get(fingerprint)) if fingerprint else None
+    if not mat and twin and _twin_matches(spec["channels"], twin):
+        twin[ALIAS_PROP] = list(twin.get(ALIAS_PROP, ())) + [key]
+        existing[key] = twin
+        set_material_signature(twin, key, signature)
+        if decode: discard_pixels(files)
+        return 'duplicate', twin
+
+    status = 'updated' if mat else 'created'
+    if mat and mat.get(FINGERPRINT_PROP) != fingerprint:
+        # 内容已变化: 复用该材质的重复组不再相同, 解除别名 (及其签名), 之后作为独立组导入
+        old = mat.get(FINGERPRINT_PROP)
+        if fingerprints is not None and fingerprints.get(old) == mat: del fingerprints[old]
+        for alias in list(mat.get(ALIAS_PROP, ())):
+            set_material_signature(mat, alias, None)
+            if existing.get(alias) == mat: del existing[alias]
+        if ALIAS_PROP in mat: del mat[ALIAS_PROP]
+    if not mat:
+        mat = bpy.data.materials.new(name=name)
+        mat[SOURCE_PROP] = key
+        existing[key] = mat
+    mat.use_nodes = True
+    create_pbr_material(mat, files, target_size, image_cache, lazy, pack, depth_policy, decode, spec, update=status == 'updated')
+    if fingerprint:
+        mat[FINGERPRINT_PROP] = fingerprint
+        mat[CHANNELS_PROP] = json.dumps({t: p for t, p in spec["channels"].items() if p}, ensure_ascii=False)
+        fingerprints[fingerprint] = mat
+    else:
+        for prop in (FINGERPRINT_PROP, CHANNELS_PROP):
+            if prop in mat: del mat[prop]
+    set_material_signature(mat, key, signature)
+    return status, mat
 
 class ImportPBRTexturesOperator(bpy.types.Operator):
     bl_idname = "spio.import_pbr_textures"
@@ -194,20 +1055,195 @@ class ImportPBRTexturesOperator(bpy.types.Operator):
             self.report({'ERROR'}, "路径无效")
             return {'CANCELLED'}
         
-        # 2. 扫描文件
-        groups = scan_files_with_depth(folder, context.scene.toolbox_recursion_depth, ('.png', '.jpg', '.jpeg', '.exr', '.tif', '.tga'))
-        if not groups:
+        # 2. 流式扫描文件 (边扫描边创建材质)
+        scan_stats = {}
+        groups = iter_files_with_depth(folder, context.scene.toolbox_recursion_depth, TEXTURE_EXTENSIONS, stats=scan_stats)
+
+        # 平铺模式: 同一文件夹内按文件名前缀拆分为多组
+        if context.scene.toolbox_group_mode == 'FLAT':
+            groups = (g for name, files in groups for g in group_flat_files(files, name))
+
+        # 3. 创建材质 (增量模式: 只新建新贴图组, 原地更新有变化的组)
+        target_size = int(context.scene.toolbox_target_resolution)
+        lazy = context.scene.toolbox_lazy_images
+        decode = context.scene.toolbox_parallel_decode and not lazy and PILImage is not None
+        pack = context.scene.toolbox_pack_channels
+        incremental = context.scene.toolbox_incremental_import
+        existing = material_source_index() if incremental else {}
+        image_cache = new_image_cache() if context.scene.toolbox_dedupe_images else None
+        depth_policy = new_depth_policy(context.scene.toolbox_bit_depth)
+        lazy_before, decoded_before = _lazy_state["pending"], _decode_state["decoded"]
+        fingerprints = material_fingerprint_index() if context.scene.toolbox_reuse_duplicates else None
+
+        # 规划 (可在进程池中并行, 按扫描顺序产出); 并行解码时提前为后续需要构建的贴图组提交解码任务 (未变化/重复的组不解码)
+        groups = plan_groups(groups, target_size, get_plan_pool() if context.scene.toolbox_parallel_planning else None)
+        if decode:
+            bit_depth = context.scene.toolbox_bit_depth
+            groups = prefetch_groups(groups, lambda n, f, s: texture_set_needs_build(n, f, target_size, existing, pack, bit_depth, s, fingerprints))
+        counts = {'created': 0, 'updated': 0, 'skipped': 0, 'duplicate': 0}
+        built = []
+        for name, files, spec in groups:
+            status, mat = import_texture_set(name, files, target_size, existing, image_cache, lazy, pack, depth_policy, decode, spec, fingerprints)
+            counts[status] += 1
+            if status in ('created', 'updated'):
+                built.append(mat)
+                set_material_preview(mat, context.scene.toolbox_preview_shading)
+
+        discard_pixels(list(_decode_state["futures"]))
+        created, updated, skipped, duplicate = counts['created'], counts['updated'], counts['skipped'], counts['duplicate']
+        if not created + updated + skipped + duplicate:
             self.report({'WARNING'}, "未找到贴图")
             return {'CANCELLED'}
+        decode_msg = f" | 并行解码 {_decode_state['decoded'] - decoded_before} 张贴图" if decode else ""
+        if context.scene.toolbox_parallel_decode and PILImage is None: decode_msg = " | 未安装 Pillow, 已使用普通加载"
+        proxy_msg = ""
+        proxy_size = int(context.scene.toolbox_proxy_size)
+        if proxy_size and built:
+            hits, queued = queue_texture_proxies({img for m in built for img in material_images(m)}, proxy_size)
+            proxy_msg = f" | 代理: 缓存 {hits} / 后台生成 {queued}"
+        if context.scene.toolbox_shader_warmup and built: queue_shader_warmup(built)
+        self.report({'INFO'}, f"新建 {created} / 更新 {updated} / 未变化 {skipped} 个材质" + (f" | 合并 {duplicate} 个重复贴图组" if duplicate else "") + scan_summary(scan_stats) + image_cache_summary(image_cache) + depth_policy_summary(depth_policy)
+                    + (f" | 延迟加载 {_lazy_state['pending'] - lazy_before} 张贴图" if lazy else "") + decode_msg + proxy_msg)
+        return {'FINISHED'}
 
-        # 3. 创建材质
-        count = 0
-        for name, files in groups:
-            mat = bpy.data.materials.new(name=name)
-            mat.use_nodes = True
-            create_pbr_material(mat, files)
-            count += 1
-        self.report({'INFO'}, f"导入 {count} 个材质")
+# =============================================================================
+# 功能 1b：监视文件夹自动导入
+# =============================================================================
+
+# 每次计时器回调的工作时间预算 (秒), 超出后留到下一次, 避免视口卡顿
+WATCH_TICK_BUDGET = 0.05
+WATCH_BACKLOG_INTERVAL = 0.1  # 还有待导入的贴图组时缩短回调间隔
+_watch_state = {}
+
+def _snapshot_dirs(root_path, depth):
+    """记录深度范围内所有未被忽略目录的 mtime: path -> [mtime, level, 忽略规则]"""
+    dirs = {}
+    stack = [(root_path, 0, root_ignore_rules(root_path))]
+    while stack:
+        path, level, rules = stack.pop()
+        try: dirs[path] = [os.stat(path).st_mtime_ns, level, rules]
+        except OSError: continue
+        if level < depth:
+            try:
+                _, subdirs, child_rules, _ = scan_directory(path, (), rules)
+                stack.extend((d, level + 1, child_rules) for d in subdirs)
+            except OSError: pass
+    return dirs
+
+def is_watching():
+    return bool(_watch_state)
+
+def start_watch(scene):
+    """开始监视: 以当前目录状态为基线, 之后只导入新出现的贴图组"""
+    stop_watch()
+    root = os.path.abspath(bpy.path.abspath(scene.toolbox_folder_path))
+    dirs = _snapshot_dirs(root, scene.toolbox_recursion_depth)
+    _watch_state.update(
+        root=root, depth=scene.toolbox_recursion_depth, interval=scene.toolbox_watch_interval,
+        target_size=int(scene.toolbox_target_resolution), flat=scene.toolbox_group_mode == 'FLAT',
+        dirs=dirs, check_order=deque(dirs), queue=deque(), queued=set(), sets=deque(),
+        existing=material_source_index(), imported=0,
+        image_cache=new_image_cache() if scene.toolbox_dedupe_images else None, lazy=scene.toolbox_lazy_images,
+        proxy_size=int(scene.toolbox_proxy_size), pack=scene.toolbox_pack_channels, depth_policy=new_depth_policy(scene.toolbox_bit_depth),
+        decode=scene.toolbox_parallel_decode and PILImage is not None,
+        fingerprints=material_fingerprint_index() if scene.toolbox_reuse_duplicates else None,
+    )
+    bpy.app.timers.register(_watch_tick, first_interval=_watch_state["interval"])
+
+def stop_watch():
+    if bpy.app.timers.is_registered(_watch_tick): bpy.app.timers.unregister(_watch_tick)
+    _watch_state.clear()
+
+def _watch_queue(state, path, now):
+    """目录加入待处理队列, 等待一个间隔让文件复制完成"""
+    if path in state["queued"]: return
+    state["queued"].add(path)
+    state["queue"].append((path, now + state["interval"]))
+
+def _watch_tick():
+    """计时器回调: 轮询目录 mtime, 在预算内导入新贴图组"""
+    state = _watch_state
+    if not state: return None
+    try:
+        now = time.monotonic()
+        deadline = time.perf_counter() + WATCH_TICK_BUDGET
+
+        # 1. 轮转检查目录 mtime (一半预算), 变化的目录加入队列
+        order = state["check_order"]
+        for _ in range(len(order)):
+            if time.perf_counter() > deadline - WATCH_TICK_BUDGET / 2: break
+            path = order.popleft()
+            try: mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                state["dirs"].pop(path, None)  # 目录已删除
+                continue
+            order.append(path)
+            if mtime != state["dirs"][path][0]:
+                state["dirs"][path][0] = mtime
+                _watch_queue(state, path, now)
+
+        # 2. 先导入已拆分的贴图组, 再处理到期的目录 (每次至少一项, 每组之间检查预算)
+        processed = 0
+        queue_, sets = state["queue"], state["sets"]
+        while processed == 0 or time.perf_counter() < deadline:
+            if sets:
+                g_name, g_files = sets.popleft()
+                processed += 1
+                status, mat = import_texture_set(g_name, g_files, state["target_size"], state["existing"], state["image_cache"], state["lazy"], state["pack"], state["depth_policy"], state["decode"], fingerprints=state["fingerprints"])
+                if status != 'skipped':
+                    set_material_preview(mat, bpy.context.scene.toolbox_preview_shading)
+                    state["imported"] += 1
+                    if state["proxy_size"]: queue_texture_proxies(material_images(mat), state["proxy_size"])
+                continue
+            if not queue_: break
+            path, ready = queue_[0]
+            if ready > now: break
+            queue_.popleft()
+            state["queued"].discard(path)
+            processed += 1
+            if path not in state["dirs"]: continue
+            _, level, rules = state["dirs"][path]
+            try: files, subdirs, child_rules, _ = scan_directory(path, TEXTURE_EXTENSIONS, rules)
+            except OSError: continue
+
+            # 新出现的子目录 (已按 .pbrignore 剪枝): 加入监视并排队导入
+            if level < state["depth"]:
+                for d in subdirs:
+                    if d in state["dirs"]: continue
+                    try: state["dirs"][d] = [os.stat(d).st_mtime_ns, level + 1, child_rules]
+                    except OSError: continue
+                    order.append(d)
+                    _watch_queue(state, d, now)
+
+            if not files: continue
+            name = os.path.basename(path) or os.path.basename(state["root"])
+            sets.extend(group_flat_files(files, name) if state["flat"] else [(name, files)])
+
+        if processed:
+            for area in bpy.context.screen.areas if bpy.context.screen else ():
+                if area.type == 'VIEW_3D': area.tag_redraw()
+    except Exception as e:
+        print(f"监视文件夹出错: {e}")
+    if not state: return None
+    return WATCH_BACKLOG_INTERVAL if state["sets"] else state["interval"]
+
+class ToggleWatchFolderOperator(bpy.types.Operator):
+    bl_idname = "spio.toggle_watch_folder"
+    bl_label = "监视文件夹"
+    bl_description = "定时检查贴图文件夹, 自动导入新出现的贴图组"
+
+    def execute(self, context):
+        if is_watching():
+            count = _watch_state["imported"]
+            stop_watch()
+            self.report({'INFO'}, f"已停止监视, 共自动导入 {count} 个材质")
+            return {'FINISHED'}
+        
+        if not os.path.isdir(bpy.path.abspath(context.scene.toolbox_folder_path)):
+            self.report({'ERROR'}, "路径无效")
+            return {'CANCELLED'}
+        start_watch(context.scene)
+        self.report({'INFO'}, f"开始监视 {len(_watch_state['dirs'])} 个目录")
         return {'FINISHED'}
 
 # =============================================================================
@@ -225,18 +1261,15 @@ class ImportSBSAROperator(bpy.types.Operator):
             self.report({'ERROR'}, "需安装 Substance 插件")
             return {'CANCELLED'}
 
-        # 2. 扫描文件
+        # 2. 流式扫描文件
         folder = bpy.path.abspath(context.scene.toolbox_folder_path)
-        groups = scan_files_with_depth(folder, context.scene.toolbox_recursion_depth, ('.sbsar'))
-        
-        total = sum(len(f) for _, f in groups)
-        if total == 0:
-            self.report({'WARNING'}, "未找到 SBSAR")
-            return {'CANCELLED'}
+        scan_stats = {}
+        groups = iter_files_with_depth(folder, context.scene.toolbox_recursion_depth, ('.sbsar'), stats=scan_stats)
 
         # 3. 调用插件导入
+        total = 0
         for _, files in groups:
-            if not files: continue
+            total += len(files)
             try:
                 bpy.ops.substance.ui_sbsar_load(
                     filepath=files[0], 
@@ -244,14 +1277,108 @@ class ImportSBSAROperator(bpy.types.Operator):
                     files=[{"name": os.path.basename(f)} for f in files]
                 )
             except Exception as e: print(f"Error: {e}")
-            
-        self.report({'INFO'}, f"导入 {total} 个 SBSAR")
+
+        if total == 0:
+            self.report({'WARNING'}, "未找到 SBSAR")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"导入 {total} 个 SBSAR" + scan_summary(scan_stats))
         return {'FINISHED'}
 
 # =============================================================================
 # 功能 3：预览生成
 # =============================================================================
 
+# 单物体预览: 几何节点在同一 sqrt 网格上实例化平面 + 球体, 按实例序号设置材质索引
+PREVIEW_GRID_NAME = "PBR_Preview_Grid"
+
+def _enabled_socket(sockets, name):
+    """同名插槽中当前启用的一个 (旧版本按数据类型存在多个同名插槽)"""
+    return next(s for s in sockets if s.name == name and s.enabled)
+
+def _preview_template(name, mesh):
+    """几何节点引用的模板物体 (不链接到场景)"""
+    obj = bpy.data.objects.get(name)
+    if not obj: obj = bpy.data.objects.new(name, mesh)
+    return obj
+
+def _build_preview_grid_nodes(tree, count, columns, spacing):
+    """构建网格实例化节点: 点 (按序号排成 columns 列) -> 实例化平面 + 球体 -> 实现 -> 按序号设置材质索引"""
+    nodes, links = tree.nodes, tree.links
+    nodes.clear()
+    def add(node_type, x, y):
+        node = nodes.new(node_type)
+        node.location = Vector((x, y))
+        return node
+    def math_node(operation, a, b, x, y):
+        node = add('ShaderNodeMath', x, y)
+        node.operation = operation
+        links.new(a, node.inputs[0])
+        if b is not None: node.inputs[1].default_value = b
+        return node.outputs[0]
+
+    group_in, group_out = add('NodeGroupInput', -1200, 200), add('NodeGroupOutput', 800, 0)
+    # 序号 -> (列 * 间距, -行 * 间距)
+    index = add('GeometryNodeInputIndex', -1200, -200).outputs[0]
+    col = math_node('MODULO', index, columns, -1000, -100)
+    row = math_node('FLOOR', math_node('DIVIDE', index, columns, -1000, -300), None, -800, -300)
+    xyz = add('ShaderNodeCombineXYZ', -600, -200)
+    links.new(math_node('MULTIPLY', col, spacing, -800, -100), xyz.inputs['X'])
+    links.new(math_node('MULTIPLY', row, -spacing, -600, -350), xyz.inputs['Y'])
+    points = add('GeometryNodePoints', -400, -100)
+    points.inputs['Count'].default_value = count
+    links.new(xyz.outputs['Vector'], points.inputs['Position'])
+    store = add('GeometryNodeStoreNamedAttribute', -200, -100)
+    store.data_type, store.domain = 'INT', 'POINT'
+    store.inputs['Name'].default_value = "pbr_preview_index"
+    links.new(points.outputs['Points'], store.inputs['Geometry'])
+    links.new(index, _enabled_socket(store.inputs, "Value"))
+
+    # 实例: 共享网格的平面 + 抬高 0.6 的球体
+    pair = add('GeometryNodeJoinGeometry', -200, -400)
+    for i, (obj, z) in enumerate(((_preview_template(PREVIEW_PLANE_MESH, _preview_plane_mesh()), 0.0), (_preview_template(PREVIEW_SPHERE_MESH, _preview_sphere_mesh()), 0.6))):
+        info = add('GeometryNodeObjectInfo', -700, -450 - 200 * i)
+        info.inputs['Object'].default_value = obj
+        move = add('GeometryNodeTransform', -450, -450 - 200 * i)
+        move.inputs['Translation'].default_value = (0, 0, z)
+        links.new(info.outputs['Geometry'], move.inputs['Geometry'])
+        links.new(move.outputs['Geometry'], pair.inputs['Geometry'])
+    instance = add('GeometryNodeInstanceOnPoints', 0, -100)
+    links.new(store.outputs['Geometry'], instance.inputs['Points'])
+    links.new(pair.outputs['Geometry'], instance.inputs['Instance'])
+    realize = add('GeometryNodeRealizeInstances', 200, -100)
+    links.new(instance.outputs['Instances'], realize.inputs['Geometry'])
+
+    # 先与物体自身的载体网格 (携带全部材质槽) 合并, 材质索引才对应物体的材质列表
+    join = add('GeometryNodeJoinGeometry', 400, 0)
+    links.new(group_in.outputs[0], join.inputs['Geometry'])
+    links.new(realize.outputs['Geometry'], join.inputs['Geometry'])
+    set_index = add('GeometryNodeSetMaterialIndex', 600, 0)
+    attr = add('GeometryNodeInputNamedAttribute', 400, -200)
+    attr.data_type = 'INT'
+    attr.inputs['Name'].default_value = "pbr_preview_index"
+    links.new(join.outputs['Geometry'], set_index.inputs['Geometry'])
+    links.new(_enabled_socket(attr.outputs, "Attribute"), set_index.inputs['Material Index'])
+    links.new(set_index.outputs['Geometry'], group_out.inputs[0])
+
+def create_preview_grid_object(location, materials, spacing, collection):
+    """创建单个预览物体: 网格只携带材质槽, 平面 + 球体由几何节点按网格实例化"""
+    mesh = bpy.data.meshes.get(PREVIEW_GRID_NAME) or bpy.data.meshes.new(PREVIEW_GRID_NAME)
+    # 载体网格保留一个孤立顶点 (不渲染): 实现/合并几何会跳过没有顶点的网格, 其材质列表也随之丢失
+    if not mesh.vertices: mesh.from_pydata([(0, 0, 0)], [], [])
+    mesh.materials.clear()
+    for mat in materials: mesh.materials.append(mat)
+    tree = bpy.data.node_groups.get(PREVIEW_GRID_NAME)
+    if not tree:
+        tree = bpy.data.node_groups.new(PREVIEW_GRID_NAME, 'GeometryNodeTree')
+        _new_group_socket(tree, 'INPUT', 'NodeSocketGeometry', "Geometry")
+        _new_group_socket(tree, 'OUTPUT', 'NodeSocketGeometry', "Geometry")
+    _build_preview_grid_nodes(tree, len(materials), math.ceil(math.sqrt(len(materials))), spacing)
+    obj = bpy.data.objects.new(PREVIEW_GRID_NAME, mesh)
+    obj.location = (location[0], location[1], 0)
+    obj.modifiers.new("PBR Preview Grid", 'NODES').node_group = tree
+    collection.objects.link(obj)
+    return obj
+
 class GeneratePreviewsOperator(bpy.types.Operator):
     bl_idname = "spio.generate_previews"
     bl_label = "生成材质预览"
@@ -280,14 +1407,248 @@ class GeneratePreviewsOperator(bpy.types.Operator):
         if not mats: return {'CANCELLED'}
         mats.sort(key=lambda m: m.name)
         
-        # 2. 网格排列并生成
-        grid = math.ceil(math.sqrt(len(mats)))
-        for idx, mat in enumerate(mats):
-            r, c = idx // grid, idx % grid
-            create_preview_geometry(mat.name, (start_loc.x + c*spacing, start_loc.y - r*spacing, start_loc.z), mat)
+        # 2. 网格排列并生成 (替换专用集合中上一次的预览)
+        col = preview_collection(context.scene, clear=True)
+        if context.scene.toolbox_preview_mode == 'NODES':
+            create_preview_grid_object(start_loc, mats, spacing, col)
+        else:
+            grid = math.ceil(math.sqrt(len(mats)))
+            for idx, mat in enumerate(mats):
+                r, c = idx // grid, idx % grid
+                create_preview_geometry(mat.name, (start_loc.x + c*spacing, start_loc.y - r*spacing, start_loc.z), mat, col)
+        if context.scene.toolbox_shader_warmup: queue_shader_warmup(mats)
             
         return {'FINISHED'}
 
+# =============================================================================
+# 功能 3b：着色器预热
+# =============================================================================
+
+# 批量导入后由计时器每次把少量材质赋给一个不参与渲染的微小物体, 让 EEVEE 分批编译着色器
+WARMUP_BATCH = 4
+WARMUP_INTERVAL = 0.5
+WARMUP_OBJECT = "PBR_Shader_Warmup"
+_warmup_state = {"queue": deque(), "total": 0, "done": 0, "current": 0}  # current: 当前批次中等待编译的材质数
+
+def is_warming_up():
+    return bpy.app.timers.is_registered(_warmup_tick)
+
+def _shaders_compiling():
+    """着色器编译任务是否仍在运行 (3.3 之前无法查询, 视为已完成)"""
+    try: return bpy.app.is_job_running('SHADER_COMPILATION')
+    except (AttributeError, TypeError): return False
+
+def _warmup_object():
+    """获取预热物体: WARMUP_BATCH 个微小四边形, 每个使用一个材质槽"""
+    obj = bpy.data.objects.get(WARMUP_OBJECT)
+    if obj: return obj
+    mesh = bpy.data.meshes.new(WARMUP_OBJECT)
+    verts = [(i * 2 + x, y, 0) for i in range(WARMUP_BATCH) for x, y in ((0, 0), (1, 0), (1, 1), (0, 1))]
+    mesh.from_pydata(verts, [], [tuple(range(i * 4, i * 4 + 4)) for i in range(WARMUP_BATCH)])
+    mesh.polygons.foreach_set("material_index", list(range(WARMUP_BATCH)))
+    obj = bpy.data.objects.new(WARMUP_OBJECT, mesh)
+    obj.scale = (0.001, 0.001, 0.001)
+    obj.hide_render = True
+    obj.hide_select = True
+    bpy.context.scene.collection.objects.link(obj)
+    return obj
+
+def queue_shader_warmup(materials):
+    """材质加入预热队列并启动计时器"""
+    queued = set(_warmup_state["queue"])
+    names = [m.name for m in materials if m and m.name not in queued]
+    if not names: return
+    _warmup_state["queue"].extend(names)
+    _warmup_state["total"] += len(names)
+    if not is_warming_up(): bpy.app.timers.register(_warmup_tick, first_interval=WARMUP_INTERVAL)
+
+def stop_shader_warmup():
+    """停止预热并删除预热物体"""
+    if is_warming_up(): bpy.app.timers.unregister(_warmup_tick)
+    _warmup_state.update(queue=deque(), total=0, done=0, current=0)
+    obj = bpy.data.objects.get(WARMUP_OBJECT)
+    if obj:
+        mesh = obj.data
+        bpy.data.objects.remove(obj)
+        if mesh and not mesh.users: bpy.data.meshes.remove(mesh)
+
+def _warmup_tick():
+    """计时器回调: 上一批编译完成后把下一批材质换到预热物体上, 视口重绘时编译; done 只计已编译完成的材质"""
+    state = _warmup_state
+    try:
+        if _shaders_compiling(): return WARMUP_INTERVAL
+        state["done"] += state["current"]
+        state["current"] = 0
+        batch = []
+        while state["queue"] and len(batch) < WARMUP_BATCH:
+            mat = bpy.data.materials.get(state["queue"].popleft())
+            if mat: batch.append(mat)
+            else: state["total"] -= 1  # 材质已被删除
+        if not batch:
+            stop_shader_warmup()
+            return None
+        mesh = _warmup_object().data
+        mesh.materials.clear()
+        for mat in batch: mesh.materials.append(mat)
+        state["current"] = len(batch)
+        for area in bpy.context.screen.areas if bpy.context.screen else ():
+            if area.type == 'VIEW_3D': area.tag_redraw()
+    except Exception as e:
+        print(f"着色器预热出错: {e}")
+        stop_shader_warmup()
+        return None
+    return WARMUP_INTERVAL
+
+class ShaderWarmupOperator(bpy.types.Operator):
+    bl_idname = "spio.shader_warmup"
+    bl_label = "预热着色器"
+    bl_description = "分批编译所有工具材质的 EEVEE 着色器 (需要视口处于材质预览或渲染模式); 运行中再次点击停止"
+
+    def execute(self, context):
+        if is_warming_up():
+            stop_shader_warmup()
+            self.report({'INFO'}, "已停止着色器预热")
+            return {'FINISHED'}
+        mats = [m for m in bpy.data.materials if SOURCE_PROP in m]
+        if not mats:
+            self.report({'WARNING'}, "没有工具创建的材质")
+            return {'CANCELLED'}
+        queue_shader_warmup(mats)
+        self.report({'INFO'}, f"已加入 {len(mats)} 个材质")
+        return {'FINISHED'}
+
+# =============================================================================
+# 功能 3c：命令行缩略图批量渲染
+# =============================================================================
+
+# 用法: blender -b --factory-startup --python sbsar工具v3.py -- thumbnails <贴图库> <输出目录> [--workers N] [--size 256] [--engine WORKBENCH]
+# 父进程扫描贴图组并交错分片, 每片由一个 blender -b 子进程建材质并渲染平面+球体, 全部结束后用 NumPy 拼接总览图
+THUMB_SIZE = 256
+THUMB_SAMPLES = 16
+THUMB_MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+THUMB_ENGINES = {'CYCLES': 'CYCLES', 'WORKBENCH': 'BLENDER_WORKBENCH'}
+SHEET_COLUMNS = 10
+SHEET_ROWS = 10
+_UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|\s]+')
+
+def thumbnail_file_name(index, name):
+    """单组缩略图文件名: 序号 + 去掉非法字符的组名"""
+    return f"{index:05d}_{_UNSAFE_NAME_RE.sub('_', name)}.png"
+
+def _setup_thumbnail_scene(size, engine, samples, threads):
+    """清空启动场景, 布置相机/灯光/渲染设置 (预览几何体位于原点)"""
+    scene = bpy.context.scene
+    bpy.data.batch_remove(list(scene.objects))
+    render = scene.render
+    render.engine = THUMB_ENGINES[engine]
+    render.resolution_x = render.resolution_y = size
+    render.resolution_percentage = 100
+    render.use_file_extension = False
+    render.image_settings.file_format = 'PNG'
+    render.image_settings.color_mode = 'RGBA'
+    render.threads_mode = 'FIXED'
+    render.threads = threads
+    if engine == 'CYCLES':
+        scene.cycles.device = 'CPU'
+        scene.cycles.samples = samples
+        scene.cycles.use_denoising = False
+        scene.world = scene.world or bpy.data.worlds.new("Thumb_World")
+        scene.world.use_nodes = False
+        scene.world.color = (0.4, 0.4, 0.4)
+        sun = bpy.data.objects.new("Thumb_Sun", bpy.data.lights.new("Thumb_Sun", 'SUN'))
+        sun.data.energy = 3.0
+        sun.rotation_euler = (math.radians(50), 0, math.radians(30))
+        scene.collection.objects.link(sun)
+    else:
+        scene.display.shading.light = 'STUDIO'
+        scene.display.shading.color_type = 'TEXTURE'
+    camera = bpy.data.objects.new("Thumb_Camera", bpy.data.cameras.new("Thumb_Camera"))
+    camera.location = (0, -4.5, 3.0)
+    camera.rotation_euler = (Vector((0, 0, 0.3)) - camera.location).to_track_quat('-Z', 'Y').to_euler()
+    scene.collection.objects.link(camera)
+    scene.camera = camera
+    return scene
+
+def _thumbnail_worker(job_file):
+    """子进程: 依次为分到的贴图组建材质并渲染, 每组渲染后删除物体/材质/图片以控制内存"""
+    with open(job_file, encoding="utf-8") as f: job = json.load(f)
+    scene = _setup_thumbnail_scene(job["size"], job["engine"], job["samples"], job["threads"])
+    col = preview_collection(scene)
+    for index, name, files in job["sets"]:
+        out = os.path.join(job["out"], thumbnail_file_name(index, name))
+        if os.path.exists(out): continue  # 中断后重跑时跳过已渲染的组
+        mat = bpy.data.materials.new(name)
+        mat.use_nodes = True
+        try:
+            create_pbr_material(mat, files, job["target_size"])
+            set_material_preview(mat, False)
+            create_preview_geometry(name, (0, 0, 0), mat, col)
+            scene.render.filepath = out + ".part"
+            bpy.ops.render.render(write_still=True)
+            os.replace(out + ".part", out)
+            print(f"[thumbnails] {index}: {name}")
+        except Exception as e: print(f"缩略图渲染失败 {name}: {e}")
+        finally: bpy.data.batch_remove(list(col.objects) + material_images(mat) + [mat])
+
+def stitch_contact_sheets(out_dir, sets, size):
+    """把单组缩略图按序号拼成总览图 (每张 SHEET_COLUMNS x SHEET_ROWS 格) 并写出格子索引; 返回已渲染的组数"""
+    per_sheet = SHEET_COLUMNS * SHEET_ROWS
+    done, index = 0, []
+    for start in range(0, len(sets), per_sheet):
+        chunk = sets[start:start + per_sheet]
+        rows = math.ceil(len(chunk) / SHEET_COLUMNS)
+        sheet = np.empty((rows * size, SHEET_COLUMNS * size, 4), dtype=np.float32)
+        sheet[:] = (0.1, 0.1, 0.1, 1.0)  # 缺失的格子留灰
+        for cell, (i, name, _) in enumerate(chunk):
+            path = os.path.join(out_dir, thumbnail_file_name(i, name))
+            if not os.path.exists(path): continue
+            r, c = divmod(cell, SHEET_COLUMNS)
+            y = (rows - 1 - r) * size  # Blender 像素行自下而上, 第一行放在顶部
+            sheet[y:y + size, c * size:(c + 1) * size] = _read_pixels(path, (size, size))
+            done += 1
+        sheet_name = f"sheet_{start // per_sheet:04d}.png"
+        _write_pixels(sheet, os.path.join(out_dir, sheet_name))
+        index.append({"sheet": sheet_name, "columns": SHEET_COLUMNS, "size": size, "sets": [name for _, name, _ in chunk]})
+    with open(os.path.join(out_dir, "sheets.json"), "w", encoding="utf-8") as f: json.dump(index, f, ensure_ascii=False, indent=1)
+    return done
+
+def render_thumbnails(root, out_dir, workers=THUMB_MAX_WORKERS, size=THUMB_SIZE, engine='CYCLES', depth=1, flat=False, target_size=0):
+    """父进程: 扫描贴图组并分给 blender -b 子进程渲染 (CPU 线程平分), 结束后拼接总览图; 返回 (成功数, 总数)"""
+    os.makedirs(out_dir, exist_ok=True)
+    groups = iter_files_with_depth(root, depth, TEXTURE_EXTENSIONS)
+    if flat: groups = (g for name, files in groups for g in group_flat_files(files, name))
+    # 并行扫描的产出顺序不固定: 按贴图组标识排序后再编号, 重跑时序号 (文件名) 与总览图顺序保持不变
+    sets = [(i, name, files) for i, (name, files) in enumerate(sorted(groups, key=lambda g: texture_set_key(*g)))]
+    if not sets: return 0, 0
+    
+    workers = max(1, min(workers, len(sets)))
+    threads = max(1, (os.cpu_count() or workers) // workers)
+    procs = []
+    for i in range(workers):
+        job_file = os.path.join(out_dir, f".thumb_job_{i}.json")
+        job = {"sets": sets[i::workers], "out": out_dir, "size": size, "engine": engine, "samples": THUMB_SAMPLES, "threads": threads, "target_size": target_size}
+        with open(job_file, "w", encoding="utf-8") as f: json.dump(job, f)
+        procs.append((subprocess.Popen([bpy.app.binary_path, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--", "thumbnail-worker", job_file]), job_file))
+    for proc, job_file in procs:
+        proc.wait()
+        os.remove(job_file)
+    return stitch_contact_sheets(out_dir, sets, size), len(sets)
+
+def run_thumbnail_cli(argv):
+    parser = argparse.ArgumentParser(prog="blender -b --python sbsar工具v3.py -- thumbnails", description="批量渲染贴图组缩略图并拼接总览图")
+    parser.add_argument("root", help="贴图库目录")
+    parser.add_argument("out", help="输出目录 (单组 PNG + sheet_*.png + sheets.json)")
+    parser.add_argument("--workers", type=int, default=THUMB_MAX_WORKERS, help="并行的 blender 子进程数")
+    parser.add_argument("--size", type=int, default=THUMB_SIZE, help="缩略图边长")
+    parser.add_argument("--engine", choices=list(THUMB_ENGINES), default='CYCLES')
+    parser.add_argument("--depth", type=int, default=1, help="扫描子文件夹深度")
+    parser.add_argument("--flat", action="store_true", help="同一文件夹内按文件名前缀分组")
+    parser.add_argument("--target-size", type=int, default=0, help="多分辨率时选取最接近的贴图")
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    done, total = render_thumbnails(os.path.abspath(args.root), os.path.abspath(args.out), args.workers, args.size, args.engine, args.depth, args.flat, args.target_size)
+    print(f"[thumbnails] {done}/{total} 组已渲染, 用时 {time.perf_counter() - start:.1f}s -> {args.out}")
+
 # =============================================================================
 # 功能 4：批量工具 (集合 & 选中)
 # =============================================================================
@@ -379,6 +1740,142 @@ class RotateUVSelectedOperator(bpy.types.Operator):
         self.report({'INFO'}, f"选中: {count} 个物体UV已旋转")
         return {'FINISHED'}
 
+# =============================================================================
+# 功能 4b：按相机覆盖范围匹配贴图分辨率
+# =============================================================================
+
+RES_SOURCE_PROP = "pbr_res_source"  # 贴图节点属性: 调整前的原始贴图路径
+MIN_TEXTURE_SIZE = 256
+
+def uv_repeat(mesh):
+    """活动 UV 的跨度: 大于 1 为贴图在物体上重复的次数, 小于 1 为图集岛只占贴图的一部分; 无 UV 时为 1"""
+    uv = mesh.uv_layers.active
+    if not uv or not len(uv.data): return 1.0
+    coords = np.empty(len(uv.data) * 2, dtype=np.float32)
+    uv.data.foreach_get("uv", coords)
+    coords = coords.reshape(-1, 2)
+    span = float((coords.max(axis=0) - coords.min(axis=0)).max())
+    return span if span > 0 else 1.0
+
+def screen_texel_demand(scene, camera, obj):
+    """包围盒经相机投影后的屏幕像素跨度 ÷ UV 跨度 = 贴图长边所需像素; 不在画面内为 0
+    
+    UV 跨 0..5 时贴图重复 5 次, 每次重复只覆盖 1/5 的屏幕跨度; UV 岛只占 0..0.25 时整张贴图需要 4 倍像素
+    """
+    scale = scene.render.resolution_percentage / 100
+    res_x, res_y = scene.render.resolution_x * scale, scene.render.resolution_y * scale
+    points = [world_to_camera_view(scene, camera, obj.matrix_world @ Vector(corner)) for corner in obj.bound_box]
+    front = [p for p in points if p.z > 0]
+    if not front: return 0
+    if len(front) < len(points): span = max(res_x, res_y)  # 包围盒跨过相机平面: 按占满画面处理
+    else:
+        xs, ys = [p.x for p in front], [p.y for p in front]
+        if max(xs) < 0 or min(xs) > 1 or max(ys) < 0 or min(ys) > 1: return 0
+        span = max((max(xs) - min(xs)) * res_x, (max(ys) - min(ys)) * res_y)
+    return span / uv_repeat(obj.data)
+
+def resolution_variants(path):
+    """同一文件夹中与该贴图同组同类型的所有分辨率文件 (含自身)"""
+    folder, name = os.path.split(path)
+    stem = os.path.splitext(name)[0].lower()
+    t_type = classify_texture_stem(stem)
+    if not t_type: return [path]
+    prefix = texture_stem_prefix(stem)
+    try: names = os.listdir(folder)
+    except OSError: return [path]
+    variants = []
+    for n in names:
+        base, ext = os.path.splitext(n)
+        if ext.lower() not in TEXTURE_EXTENSIONS: continue
+        base = base.lower()
+        if classify_texture_stem(base) == t_type and texture_stem_prefix(base) == prefix: variants.append(os.path.join(folder, n))
+    return variants or [path]
+
+def downscale_texture(full_path, size):
+    """生成长边为 size 的缩小版本 (与视口代理共用缓存), 失败返回 None"""
+    digest = hash_texture_files([full_path]).get(full_path)
+    if not digest: return None
+    dst = proxy_file_path(full_path, digest, size)
+    if os.path.exists(dst): return dst
+    image = bpy.data.images.load(full_path, check_existing=False)
+    try:
+        w, h = image.size
+        scale = size / max(w, h)
+        image.scale(max(1, round(w * scale)), max(1, round(h * scale)))
+        image.file_format = 'OPEN_EXR' if dst.endswith('.exr') else 'PNG'
+        image.filepath_raw = dst + ".part"
+        image.save()
+        os.replace(dst + ".part", dst)
+    finally: bpy.data.images.remove(image)
+    return dst
+
+def pick_texture_for_demand(source, demand, allow_downscale=True):
+    """选择满足像素需求的最小分辨率文件; 没有合适档位且原图大一倍以上时生成缩小版本"""
+    need = max(MIN_TEXTURE_SIZE, 1 << max(0, math.ceil(math.log2(max(demand, 1)))))
+    sized = [(max(s), f) for f in resolution_variants(source) for s in (read_image_size(f),) if s]
+    if not sized: return source
+    fitting = [x for x in sized if x[0] >= need]
+    edge, best = min(fitting) if fitting else max(sized)
+    if allow_downscale and edge >= need * 2:
+        try: return downscale_texture(best, need) or best
+        except (RuntimeError, OSError) as e: print(f"缩小贴图失败 {best}: {e}")
+    return best
+
+class FitTextureResolutionOperator(bpy.types.Operator):
+    bl_idname = "spio.fit_texture_resolution"
+    bl_label = "按相机匹配贴图分辨率"
+    bl_description = "按物体在活动相机画面中的大小, 为其材质的贴图节点换用满足需求的最小分辨率"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    allow_downscale: bpy.props.BoolProperty(name="生成缩小版本", default=True, description="没有合适的分辨率档位时生成并缓存缩小版本")
+
+    def execute(self, context):
+        scene = context.scene
+        camera = scene.camera
+        if not camera:
+            self.report({'ERROR'}, "场景没有活动相机")
+            return {'CANCELLED'}
+        col = scene.batch_target_collection
+        objects = col.all_objects if col else scene.objects
+
+        # 1. 每个材质取所有使用它的物体中最大的像素需求
+        demand = {}
+        for obj in objects:
+            if obj.type != 'MESH': continue
+            need = screen_texel_demand(scene, camera, obj) if obj.visible_get() else 0
+            for slot in obj.material_slots:
+                if slot.material: demand[slot.material] = max(demand.get(slot.material, 0), need)
+
+        # 2. 重新绑定贴图节点 (同一路径的图片只加载一次)
+        loaded = {os.path.normpath(image_source_path(img)): img for img in bpy.data.images if img.source == 'FILE' or LAZY_PROP in img or DECODED_PROP in img}
+        replaced, changed, saved = set(), 0, 0
+        for mat, need in demand.items():
+            if not mat.use_nodes: continue
+            for node in mat.node_tree.nodes:
+                old = getattr(node, "image", None)
+                if node.type != 'TEX_IMAGE' or not old or (old.source != 'FILE' and LAZY_PROP not in old and DECODED_PROP not in old): continue  # 跳过 UDIM / 生成图
+                source = node.get(RES_SOURCE_PROP) or image_source_path(old)
+                current = os.path.normpath(image_source_path(old))
+                path = os.path.normpath(pick_texture_for_demand(source, need, self.allow_downscale))
+                if path == current: continue
+                image = loaded.get(path)
+                if not image:
+                    try: image = new_lazy_image(path) if LAZY_PROP in old else bpy.data.images.load(path)
+                    except RuntimeError: continue
+                    image.colorspace_settings.name = old.colorspace_settings.name
+                    loaded[path] = image
+                node[RES_SOURCE_PROP] = source
+                node.image = image
+                replaced.add(old)
+                changed += 1
+                saved += estimate_image_bytes(current) - estimate_image_bytes(path)
+
+        # 3. 释放不再被使用的大图
+        for img in replaced:
+            if img.users == 0: bpy.data.images.remove(img)
+        self.report({'INFO'}, f"检查 {len(demand)} 个材质, 调整 {changed} 个贴图节点, 约节省 {saved / (1 << 20):.0f} MB")
+        return {'FINISHED'}
+
 # =============================================================================
 # 功能 5：清理工具
 # =============================================================================
@@ -480,6 +1977,188 @@ class DeleteAllMaterialsOperator(bpy.types.Operator):
         self.report({'INFO'}, f"已成功删除 {count} 个材质！")
         return {'FINISHED'}
 
+# =============================================================================
+# 功能 6：材质资产库 (预构建 .blend 分片, 按需追加/链接)
+# =============================================================================
+
+# 工具材质按目录分类写入若干 .blend 分片 (标记为资产, 带目录与预览), 索引记录材质所在分片,
+# 其他工程只打开包含所需材质的分片, 不必重新扫描贴图和构建节点树
+LIBRARY_INDEX = "pbr_library.json"
+LIBRARY_VERSION = 1
+LIBRARY_SHARD_SIZE = 100
+LIBRARY_SHARD_RE = re.compile(r"^pbr_library_(\d{3,})\.blend$")
+LIBRARY_PREVIEW_SIZE = 128
+CATALOG_FILE = "blender_assets.cats.txt"
+
+def library_catalog_path(material):
+    """材质的资产目录路径: 贴图组所在的分类文件夹 (按文件夹分组时为组文件夹的上一级)"""
+    key = material.get(SOURCE_PROP, "")
+    folder = os.path.dirname(key)
+    if os.path.basename(folder) == os.path.basename(key): folder = os.path.dirname(folder)
+    return folder
+
+def catalog_uuid(path):
+    """目录 UUID 由路径决定, 重复导出时保持不变"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "pbr-catalog:" + path))
+
+def write_catalogs(library_dir, paths):
+    """写出资产目录定义文件 (含所有上级目录)"""
+    full = {"/".join(p.split("/")[:i + 1]) for p in paths for i in range(p.count("/") + 1)}
+    lines = ["# This is an Asset Catalog Definition file for Blender.", "VERSION 1", ""]
+    lines += [f"{catalog_uuid(p)}:{p}:{p.replace('/', '-')}" for p in sorted(full)]
+    with open(os.path.join(library_dir, CATALOG_FILE), "w", encoding="utf-8") as f: f.write("\n".join(lines) + "\n")
+
+def store_material_preview(material):
+    """用 BaseColor 贴图缩略作为资产预览 (同步生成, 后台模式也可用); 没有 BaseColor 时返回 False"""
+    node = next((n for n in material.node_tree.nodes if n.get(ROLE_PROP) == "BaseColor" and n.type == 'TEX_IMAGE' and n.image), None)
+    if not node: return False
+    try: pixels = _read_pixels(image_source_path(node.image), (LIBRARY_PREVIEW_SIZE, LIBRARY_PREVIEW_SIZE))
+    except RuntimeError as e:
+        print(f"预览生成失败 {material.name}: {e}")
+        return False
+    preview = material.preview_ensure()
+    preview.image_size = (LIBRARY_PREVIEW_SIZE, LIBRARY_PREVIEW_SIZE)
+    preview.image_pixels_float.foreach_set(pixels.ravel())
+    return True
+
+def _prepare_library_images(images):
+    """写库前把图片都变为指向原始文件的文件图片: 还原解码图/代理, 延迟图片暂时改为文件来源 (不读取像素)
+    
+    返回暂时改动的延迟图片, 写完后由 _restore_lazy_images 改回占位图
+    """
+    restore_decoded_images()
+    swap_proxies(True)
+    lazy = [image for image in images if LAZY_PROP in image]
+    for image in lazy:
+        del image[LAZY_PROP]
+        image.source = 'FILE'
+    return lazy
+
+def _restore_lazy_images(images):
+    """写库后恢复延迟图片的占位状态, 当前文件仍在首次使用时才读取贴图"""
+    for image in images:
+        image.source = 'GENERATED'
+        image[LAZY_PROP] = True
+
+def load_library_index(library_dir):
+    try:
+        with open(os.path.join(library_dir, LIBRARY_INDEX), encoding="utf-8") as f: data = json.load(f)
+    except (OSError, ValueError): return {}
+    return data.get("materials", {}) if data.get("version") == LIBRARY_VERSION else {}
+
+def export_material_library(library_dir, materials):
+    """把材质按分类写入 .blend 分片并更新索引/目录文件; 返回分片数"""
+    os.makedirs(library_dir, exist_ok=True)
+    folders = {m: library_catalog_path(m) or os.sep for m in materials}
+    try: root = os.path.commonpath(list(folders.values())) if folders else None
+    except ValueError: root = None  # 不同盘符: 只用分类文件夹名
+    catalogs = {}
+    for m, folder in folders.items():
+        rel = os.path.relpath(folder, root).replace(os.sep, "/") if root else os.path.basename(folder)
+        catalogs[m] = "PBR" if rel in (".", "") else f"PBR/{rel}"
+    # 同一分类尽量落在同一分片, 按分类导入时打开的文件更少
+    ordered = sorted(materials, key=lambda m: (catalogs[m], m.name))
+    index, marked = {}, []
+    lazy = _prepare_library_images({img for m in ordered for img in material_images(m)})
+    try:
+        for m in ordered:
+            if not m.asset_data:
+                m.asset_mark()
+                marked.append(m)
+            m.asset_data.catalog_id = catalog_uuid(catalogs[m])
+            store_material_preview(m)
+        shards = [ordered[i:i + LIBRARY_SHARD_SIZE] for i in range(0, len(ordered), LIBRARY_SHARD_SIZE)]
+        for i, shard in enumerate(shards):
+            shard_name = f"pbr_library_{i:03d}.blend"
+            bpy.data.libraries.write(os.path.join(library_dir, shard_name), set(shard), path_remap='ABSOLUTE', fake_user=True, compress=True)
+            for m in shard: index[m.name] = {"shard": shard_name, "source": m.get(SOURCE_PROP), "catalog": catalogs[m]}
+    finally:
+        for m in marked: m.asset_clear()
+        _restore_lazy_images(lazy)
+        swap_proxies(False)
+    
+    # 删除上一次导出遗留的多余分片
+    for f in os.listdir(library_dir):
+        match = LIBRARY_SHARD_RE.match(f)
+        if match and int(match.group(1)) >= len(shards): os.remove(os.path.join(library_dir, f))
+    write_catalogs(library_dir, set(catalogs.values()))
+    with open(os.path.join(library_dir, LIBRARY_INDEX), "w", encoding="utf-8") as f:
+        json.dump({"version": LIBRARY_VERSION, "materials": index}, f, ensure_ascii=False, indent=1)
+    return len(shards)
+
+def _merge_library_groups(materials):
+    """追加的材质带入的节点组副本 (如 "PBR Master v1.001") 换回当前文件已有的同名组"""
+    for m in materials:
+        for node in m.node_tree.nodes if m.node_tree else ():
+            group = getattr(node, "node_tree", None)
+            base = group.name.rsplit(".", 1)[0] if group else None
+            if base and base != group.name and base in _PBR_GROUP_BUILDERS and base in bpy.data.node_groups:
+                node.node_tree = bpy.data.node_groups[base]
+    for name in _PBR_GROUP_BUILDERS:
+        for group in [g for g in bpy.data.node_groups if g.name.startswith(name + ".") and not g.users]: bpy.data.node_groups.remove(group)
+
+def load_library_materials(library_dir, names, link=False):
+    """从资产库按需追加/链接材质: 只打开包含所需材质的分片; 返回 (已载入的材质, 库中没有的名称)"""
+    index = load_library_index(library_dir)
+    by_shard, missing = {}, []
+    for name in names:
+        entry = index.get(name)
+        if entry: by_shard.setdefault(entry["shard"], []).append(name)
+        else: missing.append(name)
+    loaded = []
+    for shard, wanted in by_shard.items():
+        with bpy.data.libraries.load(os.path.join(library_dir, shard), link=link) as (data_from, data_to):
+            data_to.materials = [n for n in wanted if n in data_from.materials]
+        loaded.extend(m for m in data_to.materials if m)
+    if not link: _merge_library_groups(loaded)
+    return loaded, missing
+
+class ExportMaterialLibraryOperator(bpy.types.Operator):
+    bl_idname = "spio.export_material_library"
+    bl_label = "导出材质库"
+    bl_description = "把工具导入的材质写入资产库分片 (.blend), 带资产标记、目录与预览"
+
+    def execute(self, context):
+        if not hasattr(bpy.types.ID, "asset_mark"):
+            self.report({'ERROR'}, "资产库需要 Blender 3.0 以上")
+            return {'CANCELLED'}
+        library_dir = bpy.path.abspath(context.scene.toolbox_library_path)
+        if not context.scene.toolbox_library_path:
+            self.report({'ERROR'}, "请先设置资产库路径")
+            return {'CANCELLED'}
+        mats = [m for m in bpy.data.materials if SOURCE_PROP in m and not m.library]
+        if not mats:
+            self.report({'WARNING'}, "没有工具创建的材质")
+            return {'CANCELLED'}
+        start = time.perf_counter()
+        shards = export_material_library(library_dir, mats)
+        self.report({'INFO'}, f"导出 {len(mats)} 个材质到 {shards} 个分片 ({time.perf_counter() - start:.1f}s)")
+        return {'FINISHED'}
+
+class ImportLibraryMaterialsOperator(bpy.types.Operator):
+    bl_idname = "spio.import_library_materials"
+    bl_label = "从材质库载入"
+    bl_description = "按名称匹配 (逗号分隔的通配符) 从资产库追加或链接预构建材质, 已存在的材质跳过"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        library_dir = bpy.path.abspath(scene.toolbox_library_path)
+        index = load_library_index(library_dir)
+        if not index:
+            self.report({'ERROR'}, "资产库无效 (未找到索引, 请先导出)")
+            return {'CANCELLED'}
+        patterns = [p.strip() for p in scene.toolbox_library_filter.split(",") if p.strip()] or ["*"]
+        names = [n for n in index if any(fnmatch.fnmatchcase(n, p) for p in patterns) and n not in bpy.data.materials]
+        if not names:
+            self.report({'WARNING'}, "没有需要载入的材质")
+            return {'CANCELLED'}
+        start = time.perf_counter()
+        loaded, missing = load_library_materials(library_dir, names, scene.toolbox_library_link)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.report({'INFO'}, f"{'链接' if scene.toolbox_library_link else '追加'} {len(loaded)} 个材质 ({elapsed:.0f} ms)" + (f" | 库中缺失 {len(missing)} 个" if missing else ""))
+        return {'FINISHED'}
+
 # =============================================================================
 # UI 面板
 # =============================================================================
@@ -500,13 +2179,46 @@ class PBRToolboxPanel(bpy.types.Panel):
         box1 = layout.box()
         box1.prop(scene, "toolbox_folder_path", text="")
         box1.prop(scene, "toolbox_recursion_depth", text="递归深度")
+        box1.prop(scene, "toolbox_group_mode", text="分组")
+        box1.prop(scene, "toolbox_target_resolution", text="目标分辨率")
+        row_opts = box1.row()
+        row_opts.prop(scene, "toolbox_incremental_import", text="增量导入")
+        row_opts.prop(scene, "toolbox_dedupe_images", text="图片去重")
+        row_opts.prop(scene, "toolbox_reuse_duplicates", text="合并重复组")
+        row_lazy = box1.row(align=True)
+        row_lazy.prop(scene, "toolbox_lazy_images", text="延迟加载贴图")
+        if _lazy_state["pending"]:
+            row_lazy.operator("spio.resolve_lazy_images", text=f"全部加载 ({_lazy_state['pending']})", icon='IMPORT')
+        box1.prop(scene, "toolbox_parallel_planning", text="并行规划 (进程池)")
+        box1.prop(scene, "toolbox_parallel_decode", text="并行解码贴图")
+        box1.prop(scene, "toolbox_pack_channels", text="通道打包 (ARM / Alpha)")
+        box1.prop(scene, "toolbox_bit_depth", text="位深")
+        row_proxy = box1.row(align=True)
+        row_proxy.prop(scene, "toolbox_proxy_size", text="视口代理")
+        if _proxy_state["procs"]: row_proxy.label(text=f"生成中 ({len(_proxy_state['waiting'])})", icon='TIME')
         col1 = box1.column(align=True)
         col1.operator("spio.import_pbr_textures", icon='IMAGE_DATA')
         col1.operator("spio.import_sbsar_files", icon='NODE_MATERIAL')
+        row_watch = box1.row(align=True)
+        if is_watching():
+            row_watch.operator("spio.toggle_watch_folder", text="停止监视", icon='PAUSE', depress=True)
+            row_watch.label(text=f"待处理 {len(_watch_state['queue']) + len(_watch_state['sets'])} / 已导入 {_watch_state['imported']}")
+        else:
+            row_watch.operator("spio.toggle_watch_folder", text="监视文件夹", icon='VIEWZOOM')
+            row_watch.prop(scene, "toolbox_watch_interval", text="间隔")
 
         # 2. 预览生成区
         layout.label(text="2. 预览生成", icon='SPHERE')
         box2 = layout.box()
+        box2.prop(scene, "toolbox_preview_mode", text="方式")
+        box2.prop(scene, "toolbox_preview_shading", text="轻量视口着色 (基础色 + 法线)")
+        row_warm = box2.row(align=True)
+        if is_warming_up():
+            row_warm.operator("spio.shader_warmup", text="停止预热", icon='PAUSE', depress=True)
+            row_warm.label(text=f"编译中 {_warmup_state['done']} / {_warmup_state['total']}", icon='TIME')
+        else:
+            row_warm.operator("spio.shader_warmup", icon='SHADING_RENDERED')
+            row_warm.prop(scene, "toolbox_shader_warmup", text="导入后自动")
         row2 = box2.row(align=True)
         op_all = row2.operator("spio.generate_previews", text="所有材质")
         op_all.target_mode = 'ALL'
@@ -526,6 +2238,7 @@ class PBRToolboxPanel(bpy.types.Panel):
         col_col = box3.column(align=True)
         col_col.operator("spio.batch_apply_mat_uv", text="对集合应用材质&UV")
         col_col.operator("spio.batch_rotate_uv_90", text="旋转集合UV 90°")
+        col_col.operator("spio.fit_texture_resolution", text="按相机匹配贴图分辨率", icon='CAMERA_DATA')
         
         box3.separator()
         
@@ -544,19 +2257,35 @@ class PBRToolboxPanel(bpy.types.Panel):
         # 新增：删除所有材质
         row_clean.operator("spio.delete_all_materials", text="删所有材质", icon='TRASH')
 
+        # 4. 材质资产库
+        layout.label(text="4. 材质资产库", icon='ASSET_MANAGER')
+        box4 = layout.box()
+        box4.prop(scene, "toolbox_library_path", text="")
+        box4.operator("spio.export_material_library", icon='EXPORT')
+        box4.prop(scene, "toolbox_library_filter", text="名称")
+        row_lib = box4.row(align=True)
+        row_lib.prop(scene, "toolbox_library_link", text="链接")
+        row_lib.operator("spio.import_library_materials", icon='APPEND_BLEND')
+
 # =============================================================================
 # 注册
 # =============================================================================
 
 classes = (
     ImportPBRTexturesOperator,
+    ToggleWatchFolderOperator,
+    ResolveLazyImagesOperator,
     ImportSBSAROperator,
     GeneratePreviewsOperator,
+    ShaderWarmupOperator,
     BatchApplyMaterialUVOperator,
     BatchRotateUVOperator,
+    FitTextureResolutionOperator,
     RotateUVSelectedOperator, 
     CleanupSelectedOperator,
     DeleteAllMaterialsOperator, # 新类注册
+    ExportMaterialLibraryOperator,
+    ImportLibraryMaterialsOperator,
     PBRToolboxPanel
 )
 
@@ -565,18 +2294,121 @@ def register():
     for cls in classes: bpy.utils.register_class(cls)
     bpy.types.Scene.toolbox_folder_path = bpy.props.StringProperty(subtype='DIR_PATH')
     bpy.types.Scene.toolbox_recursion_depth = bpy.props.IntProperty(default=0, min=0, max=10)
+    bpy.types.Scene.toolbox_group_mode = bpy.props.EnumProperty(
+        items=[('FOLDER', "按文件夹", "每个文件夹为一组材质"),
+               ('FLAT', "按文件名", "平铺文件夹: 按贴图文件名前缀自动分组 (如 brick01_c / brick01_n)")],
+        default='FOLDER'
+    )
+    bpy.types.Scene.toolbox_target_resolution = bpy.props.EnumProperty(
+        items=[('0', "原始", "每个通道使用第一个匹配的文件"), ('1024', "1K", ""), ('2048', "2K", ""),
+               ('4096', "4K", ""), ('8192', "8K", "")],
+        default='0',
+        description="同一通道存在多个分辨率时, 选取最接近的档位 (只读文件头)"
+    )
+    bpy.types.Scene.toolbox_incremental_import = bpy.props.BoolProperty(
+        default=True,
+        description="只为新贴图组创建材质, 已导入且文件未变化的组直接跳过 (签名记录在材质上)"
+    )
+    bpy.types.Scene.toolbox_dedupe_images = bpy.props.BoolProperty(
+        default=True,
+        description="按文件内容哈希复用已加载的图片 (共享贴图/拷贝/符号链接只加载一次)"
+    )
+    bpy.types.Scene.toolbox_reuse_duplicates = bpy.props.BoolProperty(
+        default=True,
+        description="内容完全相同的贴图组 (如不同文件夹中的拷贝) 复用已导入的材质, 不再重复创建"
+    )
+    bpy.types.Scene.toolbox_lazy_images = bpy.props.BoolProperty(
+        default=False,
+        description="先用占位图构建材质, 物体可见或开始渲染时才读取贴图像素"
+    )
+    bpy.types.Scene.toolbox_parallel_planning = bpy.props.BoolProperty(
+        default=False,
+        description="在 Python 子进程池中分批规划贴图组 (分类/读取文件头), 适合上千组的贴图库; 无法启动子进程时自动就地规划"
+    )
+    bpy.types.Scene.toolbox_parallel_decode = bpy.props.BoolProperty(
+        default=False,
+        description="在线程池中用 Pillow 并行解码 8 位贴图, 主线程只写入像素 (需要 Pillow, 高位深贴图仍由 Blender 加载)"
+    )
+    bpy.types.Scene.toolbox_pack_channels = bpy.props.BoolProperty(
+        default=False,
+        description="导入前把分离的 AO/粗糙度/金属度打包成 ARM, 不透明度写入 BaseColor 的 Alpha (结果缓存)"
+    )
+    bpy.types.Scene.toolbox_bit_depth = bpy.props.EnumProperty(
+        items=[('KEEP', "保留原始", "EXR / 16 位贴图按原样加载为浮点"),
+               ('DISPLACEMENT', "仅置换保留浮点", "其余通道的高位深贴图转换为 8 位 (结果缓存)"),
+               ('GEOMETRY', "置换/法线保留浮点", "置换、法线、凹凸保留浮点, 其余转换为 8 位"),
+               ('NONE', "全部 8 位", "所有高位深贴图转换为 8 位")],
+        default='KEEP',
+        description="高位深贴图占用 4 倍内存, 粗糙度/AO 等通道 8 位即可"
+    )
+    bpy.types.Scene.toolbox_proxy_size = bpy.props.EnumProperty(
+        items=[('0', "关闭", "直接使用原图"), ('512', "512", ""), ('1024', "1K", "")],
+        default='0',
+        description="视口使用低分辨率代理贴图 (后台生成并缓存), 渲染时自动切换为原图"
+    )
+    bpy.types.Scene.toolbox_preview_shading = bpy.props.BoolProperty(
+        default=False, update=_update_preview_shading,
+        description="所有工具材质切换到只有基础色与法线的预览变体, 加快 EEVEE 着色器编译 (渲染时自动使用最终材质)"
+    )
+    bpy.types.Scene.toolbox_preview_mode = bpy.props.EnumProperty(
+        items=[('OBJECTS', "独立物体", "每个材质一组平面 + 球体物体"),
+               ('NODES', "单个物体", "一个物体用几何节点实例化整个预览网格, 适合大型材质库")],
+        default='OBJECTS'
+    )
+    bpy.types.Scene.toolbox_shader_warmup = bpy.props.BoolProperty(
+        default=False,
+        description="导入材质或生成预览后在后台分批预热 EEVEE 着色器, 避免首次重绘长时间卡顿"
+    )
+    bpy.types.Scene.toolbox_watch_interval = bpy.props.FloatProperty(default=2.0, min=0.5, max=60.0, description="监视文件夹的轮询间隔 (秒)")
+    bpy.types.Scene.toolbox_library_path = bpy.props.StringProperty(subtype='DIR_PATH', description="资产库目录 (可在偏好设置中添加为资产库)")
+    bpy.types.Scene.toolbox_library_filter = bpy.props.StringProperty(default="*", description="要载入的材质名称, 逗号分隔, 支持 * ? 通配符")
+    bpy.types.Scene.toolbox_library_link = bpy.props.BoolProperty(default=False, description="链接而不是追加 (材质保持只读, 随资产库更新)")
     bpy.types.Scene.batch_target_collection = bpy.props.PointerProperty(type=bpy.types.Collection)
     bpy.types.Scene.batch_target_material = bpy.props.PointerProperty(type=bpy.types.Material)
     bpy.types.Scene.batch_cube_size = bpy.props.FloatProperty(default=5.12, min=0.01)
+    for name, handler in _LAZY_HANDLERS + _DECODE_HANDLERS + _PROXY_HANDLERS + _SHADING_HANDLERS: getattr(bpy.app.handlers, name).append(handler)
 
 def unregister():
     """注销类与清理属性"""
+    global _hash_pool, _decode_pool, _plan_pool
+    stop_watch()
+    stop_shader_warmup()
+    for name, handler in _LAZY_HANDLERS + _DECODE_HANDLERS + _PROXY_HANDLERS + _SHADING_HANDLERS:
+        if handler in getattr(bpy.app.handlers, name): getattr(bpy.app.handlers, name).remove(handler)
+    if _hash_pool: _hash_pool.shutdown(wait=False)
+    if _decode_pool: _decode_pool.shutdown(wait=False)
+    if _plan_pool: _plan_pool.shutdown(wait=False)
+    discard_pixels(list(_decode_state["futures"]))
+    if bpy.app.timers.is_registered(_proxy_poll): bpy.app.timers.unregister(_proxy_poll)
+    _hash_pool = _decode_pool = _plan_pool = None
     for cls in reversed(classes): bpy.utils.unregister_class(cls)
     del bpy.types.Scene.toolbox_folder_path
     del bpy.types.Scene.toolbox_recursion_depth
+    del bpy.types.Scene.toolbox_group_mode
+    del bpy.types.Scene.toolbox_target_resolution
+    del bpy.types.Scene.toolbox_incremental_import
+    del bpy.types.Scene.toolbox_dedupe_images
+    del bpy.types.Scene.toolbox_reuse_duplicates
+    del bpy.types.Scene.toolbox_lazy_images
+    del bpy.types.Scene.toolbox_parallel_planning
+    del bpy.types.Scene.toolbox_parallel_decode
+    del bpy.types.Scene.toolbox_pack_channels
+    del bpy.types.Scene.toolbox_bit_depth
+    del bpy.types.Scene.toolbox_proxy_size
+    del bpy.types.Scene.toolbox_preview_shading
+    del bpy.types.Scene.toolbox_preview_mode
+    del bpy.types.Scene.toolbox_shader_warmup
+    del bpy.types.Scene.toolbox_watch_interval
+    del bpy.types.Scene.toolbox_library_path
+    del bpy.types.Scene.toolbox_library_filter
+    del bpy.types.Scene.toolbox_library_link
     del bpy.types.Scene.batch_target_collection
     del bpy.types.Scene.batch_target_material
     del bpy.types.Scene.batch_cube_size
 
 if __name__ == "__main__":
-    register()
\ No newline at end of file
+    # 命令行: blender -b --python sbsar工具v3.py -- thumbnails ... (见功能 3c), 否则按插件注册
+    cli = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if cli[:1] == ["thumbnails"]: run_thumbnail_cli(cli[1:])
+    elif cli[:1] == ["thumbnail-worker"]: _thumbnail_worker(cli[1])
+    else: register()
\ No newline at end of file
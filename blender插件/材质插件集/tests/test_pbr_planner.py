@@ -0,0 +1,229 @@
+"""pbr_planner 纯数据层测试 (不需要 Blender): python -m pytest blender插件/材质插件集/tests"""
+
+import os
+import struct
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pbr_planner as pp
+
+
+def _png(path, w, h, depth=8):
+    ihdr = struct.pack(">IIBBBBB", w, h, depth, 2, 0, 0, 0)
+    chunk = struct.pack(">I", len(ihdr)) + b"IHDR" + ihdr + struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    with open(path, "wb") as f: f.write(b"\x89PNG\r\n\x1a\n" + chunk)
+    return str(path)
+
+
+def _tga(path, w, h):
+    with open(path, "wb") as f: f.write(struct.pack("<BBBHHBHHHHBB", 0, 0, 2, 0, 0, 0, 0, 0, w, h, 24, 0))
+    return str(path)
+
+
+def _tiff(path, w, h, bits=16):
+    # 小端 TIFF: 一个 IFD, 三个条目 (宽 / 高 / 每通道位数)
+    entries = [(256, 3, 1, w), (257, 3, 1, h), (258, 3, 1, bits)]
+    ifd = struct.pack("<H", len(entries)) + b"".join(struct.pack("<HHIHH", tag, typ, cnt, val, 0) for tag, typ, cnt, val in entries)
+    with open(path, "wb") as f: f.write(b"II*\x00" + struct.pack("<I", 8) + ifd + struct.pack("<I", 0))
+    return str(path)
+
+
+def _exr(path, w, h):
+    attr = b"dataWindow\x00box2i\x00" + struct.pack("<iiiii", 16, 0, 0, w - 1, h - 1)
+    with open(path, "wb") as f: f.write(b"\x76\x2f\x31\x01" + struct.pack("<I", 2) + attr + b"\x00")
+    return str(path)
+
+
+# ----- 分类器 -----
+
+@pytest.mark.parametrize("stem, expected", [
+    ("brick_c", "BaseColor"),
+    ("brick_basecolor", "BaseColor"),
+    ("brick_albedo", "BaseColor"),
+    ("brick_n", "Normal"),
+    ("brick_normal_gl", "Normal"),
+    ("brick_arm", "ARM"),
+    ("brick_ao", "AmbientOcclusion"),
+    ("brick_r", "Roughness"),
+    ("brick_roughness", "Roughness"),
+    ("brick_metalness", "Metallic"),
+    ("brick_h", "Displacement"),
+    ("brick_height", "Displacement"),
+    ("brick_opacity", "Alpha"),
+    ("brick_emissive", "Emission"),
+    ("fabric_sheenopacity", None),
+    ("readme", None),
+])
+def test_classify_texture_stem(stem, expected):
+    assert pp.classify_texture_stem(stem) == expected
+
+
+def test_classify_texture_file_ignores_udim_and_case():
+    assert pp.classify_texture_file("/lib/Facade_C.1002.png") == "BaseColor"
+    assert pp.classify_texture_file("/lib/facade_n_1001.exr") == "Normal"
+
+
+def test_classify_texture_files_keeps_first_match_and_first_udim_tile():
+    files = ["/s/a_c.1001.png", "/s/a_c.1002.png", "/s/a_n.png", "/s/a_normal.png", "/s/notes.png"]
+    channels = pp.classify_texture_files(files)
+    assert channels["BaseColor"] == "/s/a_c.1001.png"
+    assert channels["Normal"] == "/s/a_n.png"
+    assert channels["Roughness"] is None
+    assert set(channels) == set(pp.texture_type_mapping.values())
+
+
+def test_pick_resolution_tier_uses_header_size(tmp_path):
+    small = _png(tmp_path / "brick_2k_c.png", 2048, 2048)
+    large = _png(tmp_path / "brick_4k_c.png", 4096, 4096)
+    assert pp.classify_texture_files([small, large], target_size=4096)["BaseColor"] == large
+    assert pp.classify_texture_files([small, large], target_size=1024)["BaseColor"] == small
+
+
+# ----- UDIM -----
+
+def test_split_udim():
+    assert pp.split_udim("facade_c.1001") == ("facade_c", 1001)
+    assert pp.split_udim("facade_c_1012") == ("facade_c", 1012)
+    assert pp.split_udim("facade_c_2001") == ("facade_c_2001", None)
+    assert pp.split_udim("facade_c") == ("facade_c", None)
+
+
+def test_udim_tiles_needs_two_tiles_per_sequence():
+    files = ["/s/a_c.1002.png", "/s/a_c.1001.png", "/s/a_n.1001.png", "/s/a_r.png"]
+    assert pp.udim_tiles(files) == {"/s/a_c.1001.png": [1001, 1002]}
+
+
+# ----- 文件头 -----
+
+def test_read_png_header(tmp_path):
+    path = _png(tmp_path / "a.png", 640, 480, depth=16)
+    assert pp.read_image_size(path) == (640, 480)
+    assert pp.read_image_bit_depth(path) == 16
+    assert pp.is_high_bit_depth(path)
+
+
+def test_read_tga_header(tmp_path):
+    assert pp.read_image_size(_tga(tmp_path / "a.tga", 300, 200)) == (300, 200)
+
+
+def test_read_tiff_header(tmp_path):
+    path = _tiff(tmp_path / "a.tif", 128, 64, bits=16)
+    assert pp.read_image_size(path) == (128, 64)
+    assert pp.read_image_bit_depth(path) == 16
+
+
+def test_read_exr_header(tmp_path):
+    path = _exr(tmp_path / "a.exr", 2048, 1024)
+    assert pp.read_image_size(path) == (2048, 1024)
+    assert pp.is_high_bit_depth(path)
+
+
+def test_read_header_rejects_unknown_or_missing(tmp_path):
+    bad = tmp_path / "a.png"
+    bad.write_bytes(b"not a png at all, just text....")
+    assert pp.read_image_size(str(bad)) is None
+    assert pp.read_image_size(str(tmp_path / "missing.png")) is None
+
+
+# ----- .pbrignore -----
+
+def test_ignore_rules(tmp_path):
+    root = str(tmp_path)
+    rules = pp.compile_ignore_rules(["*.tmp", "cache/", "/renders/**", "!keep.tmp", "# 注释"], root)
+    join = lambda *p: os.path.join(root, *p)
+    assert pp.is_ignored(rules, join("sub", "a.tmp"), False)
+    assert not pp.is_ignored(rules, join("sub", "keep.tmp"), False)
+    assert pp.is_ignored(rules, join("x", "cache"), True)
+    assert not pp.is_ignored(rules, join("x", "cache"), False)  # 仅目录规则
+    assert pp.is_ignored(rules, join("renders", "a", "b.png"), False)
+    assert not pp.is_ignored(rules, join("sub", "renders", "b.png"), False)  # 以 / 开头的规则锚定在根目录
+
+
+def test_scan_applies_nested_pbrignore(tmp_path):
+    (tmp_path / "brick").mkdir()
+    (tmp_path / "brick" / "brick_c.png").write_bytes(b"")
+    (tmp_path / "brick" / "brick_c.psd").write_bytes(b"")
+    (tmp_path / "wip").mkdir()
+    (tmp_path / "wip" / "wip_c.png").write_bytes(b"")
+    (tmp_path / "Backup_01").mkdir()
+    (tmp_path / "Backup_01" / "old_c.png").write_bytes(b"")
+    (tmp_path / pp.IGNORE_FILE).write_text("wip/\n", encoding="utf-8")
+    stats = {}
+    groups = sorted(pp.iter_files_with_depth(str(tmp_path), 1, pp.TEXTURE_EXTENSIONS, stats=stats))
+    assert groups == [("brick", [str(tmp_path / "brick" / "brick_c.png")])]
+    assert stats["ignored"] == 2  # wip/ 与默认规则中的 Backup_*/
+
+
+# ----- 平铺分组 -----
+
+def test_group_flat_files_groups_by_prefix_and_resolution():
+    files = ["/f/Brick_2k_c.png", "/f/Brick_4k_c.png", "/f/Brick_n.png", "/f/wood_basecolor.png", "/f/wood_rough.png", "/f/notes.txt"]
+    groups = dict(pp.group_flat_files(files, "flat"))
+    assert sorted(groups) == ["Brick", "wood"]
+    assert groups["Brick"] == ["/f/Brick_2k_c.png", "/f/Brick_4k_c.png", "/f/Brick_n.png"]
+    assert groups["wood"] == ["/f/wood_basecolor.png", "/f/wood_rough.png"]
+
+
+# ----- 材质规划 -----
+
+def test_plan_texture_set():
+    spec = pp.plan_texture_set(["/s/a_c.1001.png", "/s/a_c.1002.png", "/s/a_n.png"])
+    assert spec["channels"]["BaseColor"] == "/s/a_c.1001.png"
+    assert spec["tiles"] == {"/s/a_c.1001.png": [1001, 1002]}
+
+
+def test_plan_node_graph_links_and_arm():
+    channels = {"BaseColor": "/s/c.png", "ARM": "/s/arm.png", "Roughness": "/s/r.png", "Normal": "/s/n.png", "Displacement": "/s/h.png"}
+    graph = pp.plan_node_graph(channels, {"/s/c.png": [1001, 1002]})
+    names = [n["name"] for n in graph["nodes"]]
+    assert names[:6] == ["Master", "Output", "Preview", "PreviewOutput", "TexCoord", "Mapping"]
+    assert names[6:] == ["BaseColor", "ARM", "Roughness", "Normal", "Displacement"]  # TEXTURE_NODE_ORDER
+    textures = {n["name"]: n for n in graph["nodes"][6:]}
+    assert textures["BaseColor"]["is_color"] and not textures["Normal"]["is_color"]
+    assert textures["BaseColor"]["tiles"] == [1001, 1002]
+    links = set(graph["links"])
+    assert ("ARM", "Color", "Master", "ARM") in links
+    assert ("Roughness", "Color", "Master", "Roughness") not in links  # 有 ARM 时只加载不连接
+    assert ("Master", "Displacement", "Output", "Displacement") in links
+    assert ("Normal", "Color", "Preview", "Normal") in links
+    assert graph["values"] == [("Master", "ARM Factor", 1.0)]
+    # 每个连线端点都是规划中的节点
+    assert all(src in names and dst in names for src, _, dst, _ in graph["links"])
+
+
+def test_plan_node_graph_alpha_packed_into_basecolor():
+    graph = pp.plan_node_graph({"BaseColor": "/s/c.png", "Alpha": "/s/c.png"})
+    assert [n["name"] for n in graph["nodes"][6:]] == ["BaseColor"]
+    assert ("BaseColor", "Alpha", "Master", "Alpha") in graph["links"]
+    assert graph["values"] == [("Master", "ARM Factor", 0.0)]
+
+
+def _library(count):
+    return [(f"set{i:03d}", [f"/lib/set{i:03d}/set{i:03d}{s}.png" for s in ("_c", "_n", "_r")]) for i in range(count)]
+
+
+def test_plan_groups_inline_keeps_order():
+    groups = _library(5)
+    planned = list(pp.plan_groups(iter(groups)))
+    assert [(n, f) for n, f, _ in planned] == groups
+    assert all(spec == pp.plan_texture_set(f) for _, f, spec in planned)
+
+
+def test_plan_groups_process_pool_matches_inline():
+    pool = pp.new_plan_pool(max_workers=2)
+    if pool is None: pytest.skip("当前解释器不能启动 Python 子进程")
+    groups = _library(100)
+    try: planned = list(pp.plan_groups(iter(groups), pool=pool, batch_size=8, window=3))
+    finally: pool.shutdown()
+    assert planned == [(n, f, pp.plan_texture_set(f)) for n, f in groups]
+
+
+def test_plan_groups_falls_back_when_pool_is_closed():
+    pool = pp.new_plan_pool(max_workers=1)
+    if pool is None: pytest.skip("当前解释器不能启动 Python 子进程")
+    pool.shutdown()
+    groups = _library(20)
+    assert [spec for _, _, spec in pp.plan_groups(iter(groups), pool=pool)] == [pp.plan_texture_set(f) for _, f in groups]
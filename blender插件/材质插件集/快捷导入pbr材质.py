@@ -10,6 +10,8 @@ bl_info = {
 
 import bpy
 import os
+import re
+from functools import lru_cache
 from mathutils import Vector
 import math
 
@@ -51,6 +53,36 @@ texture_type_mapping = {
     "ao": "AmbientOcclusion",
 }
 
+# 预编译分类器: 映射表顺序即优先级
+# 后缀匹配按末两位字符分桶 (所有关键字至少两位), 包含匹配合并为一条交替正则
+_TEXTURE_TYPES = tuple(set(texture_type_mapping.values()))
+_KEY_PRIORITY = {k: i for i, k in enumerate(texture_type_mapping)}
+_SUFFIX_BUCKETS = {}
+for _k, _v in texture_type_mapping.items(): _SUFFIX_BUCKETS.setdefault(_k[-2:], []).append((_k, _v))
+_SUFFIX_BUCKETS = {tail: tuple(keys) for tail, keys in _SUFFIX_BUCKETS.items()}
+_CONTAINS_RE = re.compile("(?=(%s))" % "|".join(re.escape(k) for k in texture_type_mapping))
+
+@lru_cache(maxsize=1 << 18)
+def classify_texture_stem(stem):
+    """按小写文件名主干识别贴图类型 (后缀优先, 其次包含), 无法识别返回 None"""
+    if "sheenopacity" in stem: return None
+    for k, v in _SUFFIX_BUCKETS.get(stem[-2:], ()):
+        if stem.endswith(k): return v
+    hits = [m.group(1) for m in _CONTAINS_RE.finditer(stem)]
+    return texture_type_mapping[min(hits, key=_KEY_PRIORITY.__getitem__)] if hits else None
+
+def classify_texture_file(path):
+    """识别单个贴图文件的类型"""
+    return classify_texture_stem(os.path.splitext(os.path.basename(path))[0].lower())
+
+def classify_texture_files(texture_files):
+    """整理文件列表: 每种类型保留第一个匹配的文件"""
+    ordered_files = dict.fromkeys(_TEXTURE_TYPES)
+    for f in texture_files:
+        t_type = classify_texture_file(f)
+        if t_type and ordered_files[t_type] is None: ordered_files[t_type] = f
+    return ordered_files
+
 def load_texture_node(material, texture_path, label, location, is_color=True):
     """创建并返回纹理节点"""
     nodes = material.node_tree.nodes
@@ -92,25 +124,7 @@ def create_pbr_material(material, texture_files):
     links.new(principled_node.outputs['BSDF'], output_node.inputs['Surface'])
 
     # 整理文件列表
-    ordered_texture_files = {key: None for key in set(texture_type_mapping.values())}
-
-    for file_path in texture_files:
-        base_name = os.path.splitext(os.path.basename(file_path))[0].lower()
-        if "sheenopacity" in base_name: continue
-        
-        texture_type = None
-        # 1. 后缀优先匹配 (比如 _c, _arm)
-        for key, type_name in texture_type_mapping.items():
-            if base_name.endswith(key):
-                texture_type = type_name
-                break
-        # 2. 包含匹配
-        if not texture_type:
-             texture_type = next((v for k, v in texture_type_mapping.items() if k in base_name), None)
-
-        if texture_type:
-            if ordered_texture_files[texture_type] is None:
-                ordered_texture_files[texture_type] = file_path
+    ordered_texture_files = classify_texture_files(texture_files)
 
     # === 2. 更新处理顺序，加入 ARM 和 Emission ===
     offset_y = 0